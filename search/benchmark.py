@@ -0,0 +1,256 @@
+# benchmark.py
+# ------------
+# Solves a fixed corpus of sliding tile puzzles and maze layouts with the
+# solvers of EightPuzzleAgent and SearchAgent and reports how much work each
+# one took, optionally comparing the numbers with a stored baseline.
+
+import sys
+import time
+import json
+import multiprocessing
+import search
+import layout
+import pacman
+import searchAgents
+import eightpuzzle
+import eightPuzzleAgents
+import eightPuzzleBatch
+
+# Puzzle suites: name -> (size, number of boards, random moves, seed, agents).
+# The boards are random walks from the goal generated from the seed, so the
+# corpus is the same on every machine.  The blind searches (breadth first,
+# uniform cost and A* without a heuristic) get a smaller suite of their own,
+# and the 15 puzzle suite only runs the solvers that finish there in seconds.
+PUZZLE_SUITES = {'puzzle3': (3, 20, 60, 0, [0, 1, 2, 3, 4, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 20]),
+                 'puzzle3blind': (3, 5, 60, 1, [5, 6, 7]),
+                 'puzzle4': (4, 10, 100, 0, [9, 12, 16, 17, 20])}
+
+# Maze cases: (layout, problem, search function, heuristic, backward heuristic)
+# where the backward heuristic is only used by bidirectional A*
+MAZE_CASES = []
+for mazeName in ['tinyMaze', 'smallMaze', 'mediumMaze', 'bigMaze', 'openMaze', 'contoursMaze']:
+    for fn, heuristic, backwardHeuristic in [('bfs', None, None), ('dfs', None, None), ('ucs', None, None),
+                                             ('bucs', None, None), ('idastar', 'manhattanHeuristic', None),
+                                             ('astar', 'manhattanHeuristic', None),
+                                             ('bastar', 'manhattanHeuristic', None), ('bibfs', None, None),
+                                             ('biastar', 'manhattanHeuristic', 'startManhattanHeuristic')]:
+        if fn == 'idastar' and mazeName in ['bigMaze', 'openMaze']: continue  # far too slow
+        MAZE_CASES.append((mazeName, 'PositionSearchProblem', fn, heuristic, backwardHeuristic))
+for mazeName in ['tinyCorners', 'mediumCorners']:
+    for fn, heuristic in [('bfs', None), ('astar', 'cornersHeuristic'), ('bastar', 'cornersHeuristic')]:
+        MAZE_CASES.append((mazeName, 'CornersProblem', fn, heuristic, None))
+
+
+def getCases(suites, agents=None):
+    """
+    Returns the benchmark cases of the given suites ('maze' or a name in
+    PUZZLE_SUITES) as (key, kind, arguments) tuples.  agents overrides the
+    EightPuzzleAgent indices of the puzzle suites.
+    """
+    cases = []
+    for suite in suites:
+        if suite == 'maze':
+            for mazeName, problem, fn, heuristic, backwardHeuristic in MAZE_CASES:
+                key = 'maze/%s/%s/%s' % (mazeName, problem, fn)
+                if heuristic is not None: key += ',' + heuristic
+                if backwardHeuristic is not None: key += ',' + backwardHeuristic
+                cases.append((key, 'maze', (mazeName, problem, fn, heuristic, backwardHeuristic)))
+        elif suite in PUZZLE_SUITES:
+            size, count, moves, seed, suiteAgents = PUZZLE_SUITES[suite]
+            if agents is not None: suiteAgents = agents
+            boards = eightPuzzleBatch.randomBoards(count, size, moves, seed)
+            for agent in suiteAgents:
+                for boardIndex, (numbers, boardSize) in enumerate(boards):
+                    key = '%s/%02d/agent%d' % (suite, boardIndex, agent)
+                    cases.append((key, 'puzzle', (numbers, boardSize, agent)))
+        else:
+            raise Exception('Unknown benchmark suite: ' + suite)
+    return cases
+
+
+def solvePuzzle(numbers, size, agent, stats):
+    problem = eightpuzzle.EightPuzzleSearchProblem(eightpuzzle.EightPuzzleState(numbers, size), size)
+    start = time.time()
+    path = eightPuzzleAgents.EightPuzzleAgent(problem, agent, stats).searchFunction
+    seconds = time.time() - start
+    if path is None: return -1, problem._expanded, seconds
+    return len(path), problem._expanded, seconds
+
+
+def solveMaze(mazeName, problemName, fn, heuristic, backwardHeuristic, stats):
+    state = pacman.GameState()
+    state.initialize(layout.getLayout(mazeName), 0)
+    if problemName == 'PositionSearchProblem':
+        problem = searchAgents.PositionSearchProblem(state, warn=False, visualize=False)
+    else:
+        problem = getattr(searchAgents, problemName)(state)
+    func = getattr(search, fn)
+    start = time.time()
+    if heuristic is None:
+        path = func(problem, stats=stats)
+    elif backwardHeuristic is None:
+        path = func(problem, heuristic=getattr(searchAgents, heuristic), stats=stats)
+    else:
+        path = func(problem, heuristic=getattr(searchAgents, heuristic),
+                    backwardHeuristic=getattr(searchAgents, backwardHeuristic), stats=stats)
+    seconds = time.time() - start
+    return problem.getCostOfActions(path), problem._expanded, seconds
+
+
+def runCase(case):
+    """
+    Runs a single case; called in a fresh worker process so that the peak
+    memory belongs to this case alone.  Returns a dictionary of results;
+    seconds only covers the search itself, not loading the case, and memory
+    is the peak resident memory in kilobytes above what the worker already
+    held when it started the case (a forked worker starts out with the
+    pages of its parent), or None where it cannot be measured.
+    """
+    key, kind, arguments = case
+    startMemory = search.residentMemory()
+    stats = search.SearchStatistics()
+    if kind == 'puzzle':
+        length, expanded, seconds = solvePuzzle(*(arguments + (stats,)))
+    else:
+        length, expanded, seconds = solveMaze(*(arguments + (stats,)))
+    if stats.peakMemory is None: stats.finish()
+    if seconds > 0: nodesPerSecond = expanded / seconds
+    else: nodesPerSecond = 0.0
+    if stats.peakMemory is None or startMemory is None: memory = None
+    else: memory = max(0, stats.peakMemory - startMemory)
+    return {'key': key, 'length': length, 'expanded': expanded, 'generated': stats.generated,
+            'seconds': seconds, 'nodesPerSecond': nodesPerSecond, 'memory': memory}
+
+
+def runBenchmark(cases, workers=1, output=sys.stdout):
+    "Runs the cases and prints one line per case.  Returns the results."
+    pool = multiprocessing.Pool(workers, maxtasksperchild=1)
+    results = []
+    output.write('%-70s %6s %9s %11s %9s %9s\n' % ('case', 'length', 'expanded', 'nodes/s', 'seconds', 'memory'))
+    try:
+        for result in pool.imap(runCase, cases):
+            output.write('%-70s %6d %9d %11.0f %9.4f %9s\n' %
+                         (result['key'], result['length'], result['expanded'],
+                          result['nodesPerSecond'], result['seconds'], result['memory']))
+            output.flush()
+            results.append(result)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def compareWithBaseline(results, baseline, tolerance, output=sys.stdout):
+    """
+    Lists the cases that got worse than in the baseline: a different
+    solution length, more expansions, or a wall time or memory above
+    tolerance times the baseline (ignoring differences under 10
+    milliseconds and under a megabyte).  Returns the number of regressions.
+    """
+    baseResults = dict([(result['key'], result) for result in baseline['results']])
+    regressions = 0
+    for result in results:
+        if result['key'] not in baseResults: continue
+        base = baseResults[result['key']]
+        problems = []
+        if result['length'] != base['length']:
+            problems.append('length %d -> %d' % (base['length'], result['length']))
+        if result['expanded'] > base['expanded']:
+            problems.append('expanded %d -> %d' % (base['expanded'], result['expanded']))
+        if result['seconds'] > base['seconds'] * tolerance and result['seconds'] - base['seconds'] > 0.01:
+            problems.append('seconds %.4f -> %.4f' % (base['seconds'], result['seconds']))
+        baseMemory, memory = base.get('memory'), result['memory']
+        if (baseMemory is not None and memory is not None and
+            memory > baseMemory * tolerance and memory - baseMemory > 1024):
+            problems.append('memory %d -> %d' % (baseMemory, memory))
+        if problems:
+            regressions += 1
+            output.write('REGRESSION %s: %s\n' % (result['key'], ', '.join(problems)))
+    missing = len([key for key in baseResults if key not in set([result['key'] for result in results])])
+    output.write('%d of %d cases regressed against the baseline (%d baseline cases not run)\n' %
+                 (regressions, len(results), missing))
+    return regressions
+
+
+def default(str):
+    return str + ' [Default: %default]'
+
+
+def readCommand(argv):
+    """
+    Processes the command used to run the benchmark from the command line.
+    """
+    from optparse import OptionParser
+    usageStr = """
+       USAGE:      python benchmark.py <options>
+       EXAMPLES:   (1) python benchmark.py --save baseline.json
+                       - runs every suite and stores the results
+                   (2) python benchmark.py --suites puzzle3 --agents 2,12,16 --baseline baseline.json
+                       - compares three 8 puzzle solvers against the stored results
+       """
+    parser = OptionParser(usageStr)
+
+    parser.add_option('-s', '--suites', dest='suites',
+                      help=default('Comma separated suites to run: maze, ' + ', '.join(sorted(PUZZLE_SUITES.keys()))),
+                      default='maze,' + ','.join(sorted(PUZZLE_SUITES.keys())))
+    parser.add_option('-a', '--agents', dest='agents',
+                      help=default('Comma separated EightPuzzleAgent indices, instead of those of each puzzle suite'),
+                      default=None)
+    parser.add_option('-b', '--baseline', dest='baseline',
+                      help=default('Baseline file to compare the results with'),
+                      default=None)
+    parser.add_option('--save', dest='save',
+                      help=default('File to store the results in, for use as a baseline'),
+                      default=None)
+    parser.add_option('-t', '--tolerance', type='float', dest='tolerance',
+                      help=default('Factor by which a case may get slower or use more memory than the baseline'),
+                      default=1.5)
+    parser.add_option('-w', '--workers', type='int', dest='workers',
+                      help=default('Number of worker processes; use 1 for stable timings'),
+                      default=1)
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.workers < 1: parser.error('At least one worker is needed')
+    if options.tolerance < 1: parser.error('The tolerance should be at least 1')
+
+    agents = None
+    if options.agents is not None:
+        agents = [int(agent) for agent in options.agents.split(',')]
+        for agent in agents:
+            if agent < 0 or agent > 20: parser.error('Agent is a value between 0 and 20')
+
+    args = dict()
+    args['cases'] = getCases(options.suites.split(','), agents)
+    args['workers'] = options.workers
+    args['baseline'] = options.baseline
+    args['save'] = options.save
+    args['tolerance'] = options.tolerance
+    return args
+
+
+if __name__ == '__main__':
+    """
+    The main function called when benchmark.py is run
+    from the command line:
+    > python benchmark.py
+
+    See the usage string for more details.
+    > python benchmark.py --help
+    """
+    args = readCommand(sys.argv[1:])
+    start = time.time()
+    results = runBenchmark(args['cases'], args['workers'])
+    print 'Ran %d cases in %.1f seconds' % (len(results), time.time() - start)
+
+    if args['save'] is not None:
+        f = open(args['save'], 'w')
+        try: json.dump({'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}, f, indent=1, sort_keys=True)
+        finally: f.close()
+
+    if args['baseline'] is not None:
+        f = open(args['baseline'])
+        try: baseline = json.load(f)
+        finally: f.close()
+        if compareWithBaseline(results, baseline, args['tolerance']) > 0:
+            sys.exit(1)
@@ -1,70 +1,150 @@
 import itertools
 import util
 import search
-from eightpuzzle import EightPuzzleState
+import eightpuzzle
+import eightPuzzlePatternDatabase
 
 
 class EightPuzzleAgent():
     "A SearchAgent for Eight Puzzle Problem using A*"
 
-    def __init__(self, problem, index=0):
-        if index == 0:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_euclidManhattanHeuristic)
+    def __init__(self, problem, index=0, stats=None, budget=None):
+        # stats and budget: an optional search.SearchStatistics to fill in
+        # and search.SearchBudget to stay within
+        # Searching an unsolvable puzzle would exhaust half of its state space
+        if not problem.isSolvable():
+            self.searchFunction = None
+        elif index == 0:
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_euclidManhattanHeuristic, stats=stats, budget=budget)
         elif index == 1:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_euclidHeuristic)
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_euclidHeuristic, stats=stats, budget=budget)
         elif index == 2:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_manhattanHeuristic)
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_manhattanHeuristic, stats=stats, budget=budget)
         elif index == 3:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_displacedHeuristic)
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_displacedHeuristic, stats=stats, budget=budget)
         elif index == 4:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_displacedManhattanHeuristic)
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_displacedManhattanHeuristic, stats=stats, budget=budget)
         elif index == 5:
-            self.searchFunction = search.breadthFirstSearch(problem)
+            self.searchFunction = search.breadthFirstSearch(problem, stats=stats, budget=budget)
         elif index == 6:
-            self.searchFunction = search.uniformCostSearch(problem)
+            self.searchFunction = search.uniformCostSearch(problem, stats=stats, budget=budget)
         elif index == 7:
-            self.searchFunction = search.aStarSearch(problem, search.nullHeuristic())
+            self.searchFunction = search.aStarSearch(problem, search.nullHeuristic, stats=stats, budget=budget)
         elif index == 8:
-            self.searchFunction = search.aStarSearch(problem, eightPuzzle_thinkingAhead)
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_thinkingAhead, stats=stats, budget=budget)
+        elif index == 9:
+            self.searchFunction = search.iterativeDeepeningAStarSearch(problem, eightPuzzle_manhattanHeuristic, stats=stats, budget=budget)
+        elif index == 10:
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_patternDatabaseHeuristic, stats=stats, budget=budget)
+        elif index == 11:
+            self.searchFunction = search.iterativeDeepeningAStarSearch(problem, eightPuzzle_patternDatabaseHeuristic, stats=stats, budget=budget)
+        elif index == 12:
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_linearConflictHeuristic, stats=stats, budget=budget)
+        elif index == 13:
+            self.searchFunction = search.aStarSearch(problem, eightPuzzle_walkingDistanceHeuristic, stats=stats, budget=budget)
+        elif index == 14:
+            self.searchFunction = search.bidirectionalBreadthFirstSearch(problem, stats=stats, budget=budget)
+        elif index == 15:
+            self.searchFunction = search.bidirectionalAStarSearch(problem, eightPuzzle_manhattanHeuristic,
+                                                                  eightPuzzle_startManhattanHeuristic,
+                                                                  stats=stats, budget=budget)
+        elif index == 16:
+            self.searchFunction = search.bucketAStarSearch(problem, eightPuzzle_manhattanHeuristic, stats=stats, budget=budget)
+        elif index == 17:
+            self.searchFunction = search.bucketAStarSearch(problem, eightPuzzle_linearConflictHeuristic, stats=stats, budget=budget)
+        elif index == 18:
+            self.searchFunction = search.anytimeWeightedAStarSearch(problem, eightPuzzle_manhattanHeuristic, 2.0,
+                                                                    stats=stats, budget=budget)
+        elif index == 19:
+            # Interactive use: the best answer found within a tenth of a second
+            self.searchFunction = search.anytimeWeightedAStarSearch(problem, eightPuzzle_linearConflictHeuristic, 3.0, 0.1,
+                                                                    stats=stats, budget=budget)
+        elif index == 20:
+            self.searchFunction = search.compactAStarSearch(problem, eightPuzzle_linearConflictHeuristic, stats=stats, budget=budget)
+
+
+def getSearchSteps(problem, index=0):
+    """
+    Returns a search.SearchEvent generator for the search of agent index,
+    or None if the problem is unsolvable.  The anytime agents (18 and 19)
+    yield an event with a path for every improved solution.
+    """
+    if not problem.isSolvable():
+        return None
+    heuristics = {0: eightPuzzle_euclidManhattanHeuristic, 1: eightPuzzle_euclidHeuristic,
+                  2: eightPuzzle_manhattanHeuristic, 3: eightPuzzle_displacedHeuristic,
+                  4: eightPuzzle_displacedManhattanHeuristic, 7: search.nullHeuristic,
+                  8: eightPuzzle_thinkingAhead, 10: eightPuzzle_patternDatabaseHeuristic,
+                  12: eightPuzzle_linearConflictHeuristic, 13: eightPuzzle_walkingDistanceHeuristic}
+    if index in heuristics:
+        return search.aStarSearchSteps(problem, heuristics[index])
+    elif index == 5:
+        return search.breadthFirstSearchSteps(problem)
+    elif index == 6:
+        return search.uniformCostSearchSteps(problem)
+    elif index == 9:
+        return search.iterativeDeepeningAStarSearchSteps(problem, eightPuzzle_manhattanHeuristic)
+    elif index == 11:
+        return search.iterativeDeepeningAStarSearchSteps(problem, eightPuzzle_patternDatabaseHeuristic)
+    elif index == 14:
+        return search.bidirectionalBreadthFirstSearchSteps(problem)
+    elif index == 15:
+        return search.bidirectionalAStarSearchSteps(problem, eightPuzzle_manhattanHeuristic,
+                                                    eightPuzzle_startManhattanHeuristic)
+    elif index == 16:
+        return search.bucketAStarSearchSteps(problem, eightPuzzle_manhattanHeuristic)
+    elif index == 17:
+        return search.bucketAStarSearchSteps(problem, eightPuzzle_linearConflictHeuristic)
+    elif index == 18:
+        return search.anytimeWeightedAStarSearchSteps(problem, eightPuzzle_manhattanHeuristic, 2.0)
+    elif index == 19:
+        return search.anytimeWeightedAStarSearchSteps(problem, eightPuzzle_linearConflictHeuristic, 3.0, 0.1)
+    elif index == 20:
+        return search.compactAStarSearchSteps(problem, eightPuzzle_linearConflictHeuristic)
+    raise Exception('Agent %d cannot be run step by step' % index)
+
+
+def getNumbers(state):
+    "Returns the numbers of a puzzle state in row-major order."
+    if hasattr(state, 'tiles'):
+        return state.tiles
+    return itertools.chain(*state.cells)
 
 
 def eightPuzzle_euclidHeuristic(state, problem, info={}):
     "The Euclid distance heuristic for a EightPuzzleProblem"
 
+    distances = eightpuzzle.getGoalTables(problem.size).euclid
     sum = 0
-    arrayX = list(
-        itertools.chain(*[([i] * problem.size) for i in range(problem.size)]))  # [0, 0, 0, 1, 1, 1, 2, 2, 2] for size = 3
-    arrayY = range(0, problem.size) * problem.size  # [0, 1, 2, 0, 1, 2, 0, 1, 2] for size = 3
-
-    for row in range(problem.size):
-        for col in range(problem.size):
-            sum = sum + ((row - arrayX[state.cells[row][col]]) ** 2 + (
-                    col - arrayY[state.cells[row][col]]) ** 2) ** 0.5
+    for index, number in enumerate(getNumbers(state)):
+        sum = sum + distances[index][number]
     return sum
 
 
 def eightPuzzle_manhattanHeuristic(state, problem, info={}):
     "The Manhattan distance heuristic for a EightPuzzleProblem"
 
+    # Puzzle states keep their distance up to date on every move
+    return state.manhattan
+
+
+def eightPuzzle_startManhattanHeuristic(state, problem, info={}):
+    """
+    The Manhattan distance of a state from the start board, used as the
+    backward heuristic of bidirectional A*
+    """
+    distances = eightpuzzle.getStartManhattanTable(getNumbers(problem.getStartState()), problem.size)
     sum = 0
-    arrayX = list(
-        itertools.chain(*[([i] * problem.size) for i in range(problem.size)]))  # [0, 0, 0, 1, 1, 1, 2, 2, 2] for size = 3
-    arrayY = range(0, problem.size) * problem.size  # [0, 1, 2, 0, 1, 2, 0, 1, 2] for size = 3
-
-    for row in range(problem.size):
-        for col in range(problem.size):
-            sum = sum + util.manhattanDistance((row, col),
-                                               (arrayX[state.cells[row][col]], arrayY[state.cells[row][col]]))
+    for index, number in enumerate(getNumbers(state)):
+        sum = sum + distances[index][number]
     return sum
 
 
 def eightPuzzle_displacedHeuristic(state, problem, info={}):
+    displaced = eightpuzzle.getGoalTables(problem.size).displaced
     notInPlace = 0
-    goalPuzzle = EightPuzzleState(range(0, problem.size ** 2), problem.size)
-    for row in range(problem.size):
-        for col in range(problem.size):
-            if state.cells[row][col] != goalPuzzle.cells[row][col]:
-                notInPlace = notInPlace + 1
+    for index, number in enumerate(getNumbers(state)):
+        notInPlace = notInPlace + displaced[index][number]
     return notInPlace
 
 
@@ -85,3 +165,108 @@ def eightPuzzle_thinkingAhead(state, problem, info={}):
             h2 = haux
 
     return eightPuzzle_euclidHeuristic(state, problem) + h2
+
+
+def eightPuzzle_patternDatabaseHeuristic(state, problem, info={}):
+    "The additive pattern database heuristic for a EightPuzzleProblem"
+    return eightPuzzlePatternDatabase.getPatternDatabase(problem.size).evaluate(state)
+
+
+# Extra moves forced by the tiles of one row (or column) that belong to it,
+# keyed by the tuple of their goal columns (or rows) in board order.  A tile
+# that must leave the line to let another pass costs two extra moves, and the
+# tiles that can stay form the longest increasing subsequence of the key.
+LINEAR_CONFLICT_CACHE = {}
+
+def getLinearConflictTable(size):
+    if size not in LINEAR_CONFLICT_CACHE:
+        table = {}
+        for length in range(size + 1):
+            for key in itertools.permutations(range(size), length):
+                longest = [1] * length
+                for i in range(length):
+                    for j in range(i):
+                        if key[j] < key[i] and longest[j] + 1 > longest[i]:
+                            longest[i] = longest[j] + 1
+                table[key] = 2 * (length - max(longest + [0]))
+        LINEAR_CONFLICT_CACHE[size] = table
+    return LINEAR_CONFLICT_CACHE[size]
+
+
+def eightPuzzle_linearConflictHeuristic(state, problem, info={}):
+    "The Manhattan distance plus the linear conflicts of every row and column"
+
+    size = problem.size
+    goal = eightpuzzle.getGoalTables(size)
+    conflicts = getLinearConflictTable(size)
+    numbers = list(getNumbers(state))
+    sum = state.manhattan
+    for line in range(size):
+        row = numbers[line * size:(line + 1) * size]
+        sum = sum + conflicts[tuple([goal.goalCol[n] for n in row if n != 0 and goal.goalRow[n] == line])]
+        col = numbers[line::size]
+        sum = sum + conflicts[tuple([goal.goalRow[n] for n in col if n != 0 and goal.goalCol[n] == line])]
+    return sum
+
+
+# Walking distance tables, keyed by a flattened size x size matrix whose entry
+# [row][goalRow] counts the tiles in row that belong in goalRow, followed by
+# the row of the blank.  Columns are looked up in the same table since the
+# goal looks the same along rows and columns.
+WALKING_DISTANCE_CACHE = {}
+
+def getWalkingDistanceTable(size):
+    """
+    Builds the walking distance of every reachable count matrix by a breadth
+    first search from the goal, moving one tile of any goal row up or down
+    into the row of the blank at a time.
+    """
+    if size not in WALKING_DISTANCE_CACHE:
+        counts = [0] * (size * size)
+        for row in range(size):
+            counts[row * size + row] = size
+        counts[0] = size - 1
+        goal = tuple(counts) + (0,)
+        table = {goal: 0}
+        current = [goal]
+        distance = 0
+        while current:
+            distance += 1
+            following = []
+            for key in current:
+                blank = key[-1]
+                for row in (blank - 1, blank + 1):
+                    if row < 0 or row == size:
+                        continue
+                    for goalRow in range(size):
+                        if key[row * size + goalRow] == 0:
+                            continue
+                        counts = list(key)
+                        counts[row * size + goalRow] -= 1
+                        counts[blank * size + goalRow] += 1
+                        counts[-1] = row
+                        nextKey = tuple(counts)
+                        if nextKey not in table:
+                            table[nextKey] = distance
+                            following.append(nextKey)
+            current = following
+        WALKING_DISTANCE_CACHE[size] = table
+    return WALKING_DISTANCE_CACHE[size]
+
+
+def eightPuzzle_walkingDistanceHeuristic(state, problem, info={}):
+    "The vertical plus the horizontal walking distance of a EightPuzzleProblem"
+
+    size = problem.size
+    goal = eightpuzzle.getGoalTables(size)
+    table = getWalkingDistanceTable(size)
+    rowCounts = [0] * (size * size + 1)
+    colCounts = [0] * (size * size + 1)
+    for index, number in enumerate(getNumbers(state)):
+        row, col = divmod(index, size)
+        if number == 0:
+            rowCounts[-1], colCounts[-1] = row, col
+        else:
+            rowCounts[row * size + goal.goalRow[number]] += 1
+            colCounts[col * size + goal.goalCol[number]] += 1
+    return table[tuple(rowCounts)] + table[tuple(colCounts)]
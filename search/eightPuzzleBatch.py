@@ -0,0 +1,197 @@
+# eightPuzzleBatch.py
+# -------------------
+# Solves many sliding tile puzzles without graphics, spreading the boards
+# over a pool of worker processes.
+
+import sys
+import time
+import random
+import itertools
+import multiprocessing
+import search
+import eightpuzzle
+import eightPuzzleAgents
+
+
+def readBoards(fileName):
+    """
+        Reads one board per line, as whitespace or comma separated numbers
+        in row-major order with 0 for the blank.  Blank lines and lines
+        starting with '#' are skipped.  The size of each board follows from
+        its number of tiles.
+    """
+    boards = []
+    f = open(fileName)
+    try:
+        for line in f:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            numbers = [int(number) for number in line.replace(',', ' ').split()]
+            size = int(round(len(numbers) ** 0.5))
+            if size ** 2 != len(numbers) or sorted(numbers) != range(size ** 2):
+                raise Exception('Not a puzzle: ' + line)
+            boards.append((numbers, size))
+    finally:
+        f.close()
+    return boards
+
+
+def randomBoards(count, size, moves, seed):
+    "Generates boards with createRandomEightPuzzle from a fixed seed."
+    random.seed(seed)
+    boards = []
+    for i in range(count):
+        puzzle = eightpuzzle.createRandomEightPuzzle(moves, size)
+        boards.append((list(eightPuzzleAgents.getNumbers(puzzle)), size))
+    return boards
+
+
+def solveBoard(job):
+    """
+        Solves a single board; runs in the worker processes.
+
+        job: a (numbers, size, agent, compact, limits) tuple, where limits
+             holds the maxNodes, maxSeconds and maxMemory of a
+             search.SearchBudget
+        Returns (numbers, moves, expanded, seconds) where moves is -1 for
+        unsolvable boards and -2 for boards that ran out of the budget.
+    """
+    numbers, size, agent, compact, limits = job
+    if compact: puzzle = eightpuzzle.CompactEightPuzzleState(numbers, size)
+    else: puzzle = eightpuzzle.EightPuzzleState(numbers, size)
+    problem = eightpuzzle.EightPuzzleSearchProblem(puzzle, size)
+    budget = None
+    if limits != (None, None, None): budget = search.SearchBudget(*limits)
+    start = time.time()
+    try:
+        path = eightPuzzleAgents.EightPuzzleAgent(problem, agent, budget=budget).searchFunction
+        if path is None: moves = -1
+        else: moves = len(path)
+    except search.SearchBudgetExceeded:
+        moves = -2
+    seconds = time.time() - start
+    return numbers, moves, problem._expanded, seconds
+
+
+def runBatch(boards, agent, workers, output, compact=False, limits=(None, None, None)):
+    """
+        Solves the boards with the given EightPuzzleAgent index and writes
+        one tab separated line per board, in input order, to output.
+        limits: (maxNodes, maxSeconds, maxMemory) of each search, see
+        search.SearchBudget
+    """
+    jobs = [(numbers, size, agent, compact, limits) for numbers, size in boards]
+    start = time.time()
+    if workers == 1:
+        pool = None
+        results = itertools.imap(solveBoard, jobs)
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(solveBoard, jobs, max(1, len(jobs) // (workers * 8)))
+
+    try:
+        output.write('board\tmoves\texpanded\tseconds\n')
+        for numbers, moves, expanded, seconds in results:
+            output.write('%s\t%d\t%d\t%.4f\n' % (','.join([str(n) for n in numbers]), moves, expanded, seconds))
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return time.time() - start
+
+
+def default(str):
+    return str + ' [Default: %default]'
+
+
+def readCommand(argv):
+    """
+    Processes the command used to run eightPuzzleBatch from the command line.
+    """
+    from optparse import OptionParser
+    usageStr = """
+       USAGE:      python eightPuzzleBatch.py <options>
+       EXAMPLES:   (1) python eightPuzzleBatch.py --input boards.txt --output results.tsv
+                       - solves every board listed in boards.txt
+                   (2) python eightPuzzleBatch.py --random 1000 --size 4 --moves 60 --agent 12
+                       - solves 1000 random 15 puzzles with A* and linear conflicts
+       """
+    parser = OptionParser(usageStr)
+
+    parser.add_option('-i', '--input', dest='input',
+                      help=default('File with one board per line'),
+                      default=None)
+    parser.add_option('-o', '--output', dest='output',
+                      help=default('File to write the results to (standard output if not given)'),
+                      default=None)
+    parser.add_option('-r', '--random', type='int', dest='random',
+                      help=default('Number of random boards to solve when no input file is given'),
+                      default=100)
+    parser.add_option('-s', '--size', type='int', dest='size',
+                      help=default('The size of the random puzzles (SIZE ** 2)'),
+                      default=3)
+    parser.add_option('--moves', type='int', dest='moves',
+                      help=default('Number of random moves used to shuffle each random puzzle'),
+                      default=30)
+    parser.add_option('--seed', type='int', dest='seed',
+                      help=default('Random seed for the random puzzles'),
+                      default=0)
+    parser.add_option('-a', '--agent', type='int', dest='agent',
+                      help=default('Select the agent (see EightPuzzleAgent)'),
+                      default=2)
+    parser.add_option('-w', '--workers', type='int', dest='workers',
+                      help=default('Number of worker processes'),
+                      default=multiprocessing.cpu_count())
+    parser.add_option('-c', '--compact', action='store_true', dest='compact',
+                      help=default('Search over compact (tuple backed) puzzle states'),
+                      default=False)
+    parser.add_option('--max-nodes', type='int', dest='maxNodes',
+                      help=default('Give up on a board after expanding this many states'),
+                      default=None)
+    parser.add_option('--max-seconds', type='float', dest='maxSeconds',
+                      help=default('Give up on a board after searching this many seconds'),
+                      default=None)
+    parser.add_option('--max-memory', type='int', dest='maxMemory',
+                      help=default('Give up on a board once its search grows the worker by this many kilobytes'),
+                      default=None)
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+
+    if options.size < 2: parser.error('Size must be > 1')
+    if options.random < 0: parser.error('The number of random boards should be positive')
+    if options.moves < 0: parser.error('The number of moves should be positive')
+    if options.workers < 1: parser.error('At least one worker is needed')
+    if options.agent < 0 or options.agent > 20: parser.error('Agent is a value between 0 and 20')
+
+    if options.input is not None: boards = readBoards(options.input)
+    else: boards = randomBoards(options.random, options.size, options.moves, options.seed)
+
+    args = dict()
+    args['boards'] = boards
+    args['agent'] = options.agent
+    args['workers'] = options.workers
+    args['compact'] = options.compact
+    args['limits'] = (options.maxNodes, options.maxSeconds, options.maxMemory)
+    args['output'] = options.output
+    return args
+
+
+if __name__ == '__main__':
+    """
+    The main function called when eightPuzzleBatch.py is run
+    from the command line:
+    > python eightPuzzleBatch.py
+
+    See the usage string for more details.
+    > python eightPuzzleBatch.py --help
+    """
+    args = readCommand(sys.argv[1:])
+    outputName = args.pop('output')
+    if outputName is None: args['output'] = sys.stdout
+    else: args['output'] = open(outputName, 'w')
+    seconds = runBatch(**args)
+    if outputName is not None: args['output'].close()
+    print >>sys.stderr, 'Solved %d boards in %.1f seconds' % (len(args['boards']), seconds)
@@ -0,0 +1,213 @@
+"""
+Disjoint additive pattern databases for the NxN puzzle.
+
+The tiles of the puzzle are split into disjoint groups (a partition).  For
+every group a table stores, for each placement of the group's tiles and
+position of the blank, the smallest number of moves *of those tiles* needed
+to bring them home.  Since the groups are disjoint and only their own moves
+are counted, the values of all groups can be added and still never
+overestimate the solution length.
+
+Tables are built once by a backwards breadth first search from the goal,
+written to PATTERN_DATABASE_DIR and memory mapped on later runs, so separate
+processes share a single copy.
+"""
+
+import os
+import mmap
+import tempfile
+import eightpuzzle
+
+PATTERN_DATABASE_DIR = 'patterns'
+UNKNOWN = 255
+
+# Partitions used when none is given.  Groups of five tiles keep the 15 puzzle
+# tables at 16 megabytes each and their construction within minutes; larger
+# groups (e.g. 6-6-3) give stronger estimates and can be passed explicitly.
+DEFAULT_PARTITIONS = {2: ((1, 2, 3),),
+                      3: ((1, 2, 3, 4), (5, 6, 7, 8)),
+                      4: ((1, 2, 3, 4, 5), (6, 7, 8, 9, 10), (11, 12, 13, 14, 15))}
+
+
+def defaultPartition(size):
+    "Returns DEFAULT_PARTITIONS[size], or consecutive groups of four tiles."
+    if size in DEFAULT_PARTITIONS:
+        return DEFAULT_PARTITIONS[size]
+    tiles = range(1, size ** 2)
+    return tuple([tuple(tiles[i:i + 4]) for i in range(0, len(tiles), 4)])
+
+
+class PatternDatabase:
+    """
+    The table of a single group of tiles.
+
+    A placement of the group is indexed by sum(position[i] * cells ** i) over
+    the tiles of the group, where cells = size ** 2, and the table holds one
+    byte per placement and blank position, at placement * cells + blank, so
+    it has cells ** (len(tiles) + 1) entries.  Keeping the blank position
+    makes the heuristic consistent: a move of the blank into a cell outside
+    the group leaves the value unchanged, and a move of a tile of the group
+    changes it by at most one.
+    """
+
+    def __init__(self, size, tiles):
+        self.size = size
+        self.tiles = tuple(tiles)
+        cells = size ** 2
+        self.powers = [cells ** i for i in range(len(self.tiles))]
+        self.table = None
+
+    def getFileName(self):
+        name = 'size%d_%s.pdb' % (self.size, '-'.join([str(tile) for tile in self.tiles]))
+        return os.path.join(PATTERN_DATABASE_DIR, name)
+
+    def load(self):
+        """
+        Memory maps the table from disk, building and saving it first if it
+        does not exist yet.
+
+        A table is written to a temporary file and renamed into place, so a
+        file under the table's name is always complete and is never truncated
+        while another process has it mapped.  Several processes may build the
+        same table at once; the last rename wins with identical contents.
+        """
+        fileName = self.getFileName()
+        length = (self.size ** 2) ** (len(self.tiles) + 1)
+        if not self.hasTable(fileName, length):
+            table = self.build()
+            try:
+                if not os.path.isdir(PATTERN_DATABASE_DIR):
+                    try: os.mkdir(PATTERN_DATABASE_DIR)
+                    except OSError:
+                        if not os.path.isdir(PATTERN_DATABASE_DIR): raise   # not made by another process
+                self.save(table, fileName)
+            except (IOError, OSError):
+                pass
+            if not self.hasTable(fileName, length):
+                # Keep the table in memory if it cannot be saved
+                self.table = str(table)
+                return self
+        f = open(fileName, 'rb')
+        try: self.table = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+        finally: f.close()
+        return self
+
+    def hasTable(self, fileName, length):
+        "Whether fileName holds a complete table of the given length."
+        try: return os.path.getsize(fileName) == length
+        except OSError: return False
+
+    def save(self, table, fileName):
+        "Writes the table to a temporary file and renames it to fileName."
+        descriptor, temporaryName = tempfile.mkstemp('.tmp', '', PATTERN_DATABASE_DIR)
+        try:
+            f = os.fdopen(descriptor, 'wb')
+            try: f.write(table)
+            finally: f.close()
+            # mkstemp creates the file readable by its owner only
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporaryName, 0666 & ~umask)
+            try:
+                os.rename(temporaryName, fileName)
+            except OSError:
+                # On Windows the rename fails if another process saved first
+                if not self.hasTable(fileName, len(table)): raise
+        finally:
+            if os.path.exists(temporaryName): os.remove(temporaryName)
+
+    def build(self):
+        """
+        Computes the table by a breadth first search backwards from the goal
+        over (placement, blank position) pairs.  Moving the blank into a cell
+        that holds no tile of the group is free, so every cost level is
+        first closed under free moves before the next level is started.
+        """
+        size, cells, powers = self.size, self.size ** 2, self.powers
+        moveTable = eightpuzzle.getMoveTable(size)
+        numTiles = len(self.tiles)
+
+        # The goal has every tile on the index equal to its number, blank on 0
+        goalIndex = sum([tile * power for tile, power in zip(self.tiles, powers)])
+        distances = bytearray([UNKNOWN]) * (cells ** numTiles * cells)
+        distances[goalIndex * cells] = 0
+        current = [goalIndex * cells]
+        level = 0
+
+        while current:
+            following = []
+            stack = [key for key in current if distances[key] == level]
+            while stack:
+                key = stack.pop()
+                index, blank = divmod(key, cells)
+                positions = []
+                for i in range(numTiles):
+                    index, position = divmod(index, cells)
+                    positions.append(position)
+                index = key // cells
+
+                for move, target in moveTable[blank]:
+                    if target in positions:
+                        # Moving a tile of the group costs one move
+                        tile = positions.index(target)
+                        nextKey = (index + (blank - target) * powers[tile]) * cells + target
+                        if distances[nextKey] > level + 1:
+                            distances[nextKey] = level + 1
+                            following.append(nextKey)
+                    else:
+                        nextKey = index * cells + target
+                        if distances[nextKey] > level:
+                            distances[nextKey] = level
+                            stack.append(nextKey)
+            current = following
+            level += 1
+
+        # The minimum over the blank positions of a placement would make a
+        # smaller table, but an inconsistent heuristic
+        return distances
+
+    def lookup(self, positions):
+        "positions: a list giving the board index of every number"
+        index = 0
+        for tile, power in zip(self.tiles, self.powers):
+            index += positions[tile] * power
+        return ord(self.table[index * self.size ** 2 + positions[0]])
+
+
+class AdditivePatternDatabase:
+    """
+    The sum of the pattern databases of a partition of the tiles.
+    """
+
+    def __init__(self, size, partition=None):
+        if partition is None: partition = defaultPartition(size)
+        self.size = size
+        self.partition = tuple([tuple(tiles) for tiles in partition])
+        self.databases = [PatternDatabase(size, tiles).load() for tiles in self.partition]
+
+    def evaluate(self, state):
+        "Returns the additive estimate for a puzzle state."
+        positions = [0] * (self.size ** 2)
+        index = 0
+        for row in state.cells:
+            for number in row:
+                positions[number] = index
+                index += 1
+        total = 0
+        for database in self.databases:
+            total += database.lookup(positions)
+        return total
+
+
+PATTERN_DATABASE_CACHE = {}
+
+def getPatternDatabase(size, partition=None):
+    """
+    Returns the AdditivePatternDatabase for a puzzle size and partition,
+    loading it only once per process.
+    """
+    if partition is None: partition = defaultPartition(size)
+    key = (size, tuple([tuple(tiles) for tiles in partition]))
+    if key not in PATTERN_DATABASE_CACHE:
+        PATTERN_DATABASE_CACHE[key] = AdditivePatternDatabase(size, partition)
+    return PATTERN_DATABASE_CACHE[key]
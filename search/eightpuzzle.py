@@ -22,7 +22,9 @@ import sys
 
 # Module Classes
 
-class EightPuzzleState:
+REVERSE_MOVES = {'up': 'down', 'down': 'up', 'left': 'right', 'right': 'left'}
+
+class EightPuzzleState(object):
     """
     The Eight Puzzle is described in the course textbook on
     page 64.
@@ -53,7 +55,9 @@ class EightPuzzleState:
             ------------
 
         The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        list (a list of lists) 'cells'.  A Zobrist key of the board is kept
+        in 'zobrist' and is used as the hash of the state, and the sum of the
+        Manhattan distances of the tiles to their goal is kept in 'manhattan'.
         """
         self.size = size
         self.cells = []
@@ -65,6 +69,8 @@ class EightPuzzleState:
                 self.cells[row].append(numbers.pop())
                 if self.cells[row][col] == 0:
                     self.blankLocation = row, col
+        self.zobrist = zobristHash(self.cells, self.size)
+        self.manhattan = manhattanDistance(self.cells, self.size)
 
     def isGoal(self):
         """
@@ -126,6 +132,24 @@ class EightPuzzleState:
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
+        # Create a copy of the current eightPuzzle
+        newPuzzle = EightPuzzleState.__new__(EightPuzzleState)
+        newPuzzle.size = self.size
+        newPuzzle.cells = [values[:] for values in self.cells]
+        newPuzzle.blankLocation = self.blankLocation
+        newPuzzle.zobrist = self.zobrist
+        newPuzzle.manhattan = self.manhattan
+        # And update it to reflect the move
+        newPuzzle.move(move)
+
+        return newPuzzle
+
+    def move(self, move):
+        """
+          Applies the move to this puzzle in place.  Moving back with
+        REVERSE_MOVES[move] restores the previous configuration, which lets
+        depth first searches work on a single board.
+        """
         row, col = self.blankLocation
         if (move == 'up'):
             newrow = row - 1
@@ -140,17 +164,18 @@ class EightPuzzleState:
             newrow = row
             newcol = col + 1
         else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0] * (self.size ** 2), self.size)
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+            raise Exception("Illegal Move")
+
+        number = self.cells[newrow][newcol]
+        self.cells[row][col] = number
+        self.cells[newrow][newcol] = 0
+        self.blankLocation = newrow, newcol
+        # Only the moved tile changes the Zobrist key and the distance
+        source, target = newrow * self.size + newcol, row * self.size + col
+        keys = getZobristTable(self.size)
+        self.zobrist ^= keys[source][number] ^ keys[target][number]
+        distances = getManhattanTable(self.size)
+        self.manhattan += distances[target][number] - distances[source][number]
 
     # Utilities for comparison and display
     def __eq__(self, other):
@@ -162,13 +187,13 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range(self.size):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return self.zobrist == other.zobrist and self.cells == other.cells
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return self.zobrist
 
     def __getAsciiString(self):
         """
@@ -191,6 +216,296 @@ class EightPuzzleState:
         return self.__getAsciiString()
 
 
+# Random keys for every (board index, number) pair of a given puzzle size.
+# The blank gets a key of 0 since its position follows from the other tiles.
+ZOBRIST_CACHE = {}
+
+def getZobristTable(size):
+    """
+        Returns a list indexed by board index whose entries are lists of
+        Zobrist keys indexed by number.  The keys are seeded by the size so
+        they are the same in every process.
+    """
+    if size not in ZOBRIST_CACHE:
+        generator = random.Random(size)
+        table = []
+        for index in range(size ** 2):
+            table.append([0] + [generator.getrandbits(62) for number in range(1, size ** 2)])
+        ZOBRIST_CACHE[size] = table
+    return ZOBRIST_CACHE[size]
+
+
+def zobristHash(cells, size):
+    """
+        Computes the Zobrist key of a board from scratch.  States update
+        their key incrementally on every move instead of calling this.
+    """
+    keys = getZobristTable(size)
+    h = 0
+    index = 0
+    for row in cells:
+        for number in row:
+            h ^= keys[index][number]
+            index += 1
+    return h
+
+
+class GoalTables:
+    """
+    Tables describing the goal of a puzzle size, built once and shared by
+    every state and heuristic (see getGoalTables).
+
+    In the goal every number sits on the board index equal to the number.
+    Distance tables are lists indexed by board index whose entries are lists
+    indexed by number:
+      manhattan: Manhattan distance to the goal index, 0 for the blank
+      euclid:    Euclidean distance to the goal index, blank included
+      displaced: 1 if the number is not on its goal index, blank included
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.goalRow = [number // size for number in range(size ** 2)]
+        self.goalCol = [number % size for number in range(size ** 2)]
+        self.manhattan = []
+        self.euclid = []
+        self.displaced = []
+        for index in range(size ** 2):
+            row, col = divmod(index, size)
+            self.manhattan.append([0] + [abs(row - self.goalRow[number]) + abs(col - self.goalCol[number])
+                                         for number in range(1, size ** 2)])
+            self.euclid.append([((row - self.goalRow[number]) ** 2 + (col - self.goalCol[number]) ** 2) ** 0.5
+                                for number in range(size ** 2)])
+            self.displaced.append([int(number != index) for number in range(size ** 2)])
+
+
+GOAL_TABLE_CACHE = {}
+
+def getGoalTables(size):
+    "Returns the GoalTables of a puzzle size."
+    if size not in GOAL_TABLE_CACHE:
+        GOAL_TABLE_CACHE[size] = GoalTables(size)
+    return GOAL_TABLE_CACHE[size]
+
+
+def getManhattanTable(size):
+    "Returns the Manhattan distance table of a puzzle size (see GoalTables)."
+    return getGoalTables(size).manhattan
+
+
+# Manhattan tables towards the start boards of bidirectional searches, see
+# getStartManhattanTable
+START_TABLE_CACHE = {}
+
+def getStartManhattanTable(numbers, size):
+    """
+    Returns a distance table laid out like GoalTables.manhattan that
+    measures the distance of every number to its index in the board numbers
+    (row-major) instead of its goal index; an estimate of the cost from
+    that board for the backward side of a bidirectional search.
+    """
+    key = tuple(numbers)
+    if key not in START_TABLE_CACHE:
+        # A batch builds one table per board; keep the cache small
+        if len(START_TABLE_CACHE) >= 64: START_TABLE_CACHE.clear()
+        startRow = [0] * (size ** 2)
+        startCol = [0] * (size ** 2)
+        for index, number in enumerate(key):
+            startRow[number], startCol[number] = divmod(index, size)
+        table = []
+        for index in range(size ** 2):
+            row, col = divmod(index, size)
+            table.append([0] + [abs(row - startRow[number]) + abs(col - startCol[number])
+                                for number in range(1, size ** 2)])
+        START_TABLE_CACHE[key] = table
+    return START_TABLE_CACHE[key]
+
+
+def manhattanDistance(cells, size):
+    """
+        Computes the Manhattan distance of a board from scratch.  States
+        update their distance by the moved tile's change instead.
+    """
+    distances = getManhattanTable(size)
+    total = 0
+    index = 0
+    for row in cells:
+        for number in row:
+            total += distances[index][number]
+            index += 1
+    return total
+
+
+# Legal moves and the board index the blank moves to, for every blank index of
+# a given puzzle size.  Built once per size and shared by all compact states.
+MOVE_TABLE_CACHE = {}
+
+def getMoveTable(size):
+    """
+        Returns a list indexed by the (flat) blank index whose entries are
+        lists of (move, targetIndex) pairs, in the same order as
+        EightPuzzleState.legalMoves.
+    """
+    if size not in MOVE_TABLE_CACHE:
+        table = []
+        for index in range(size ** 2):
+            row, col = divmod(index, size)
+            moves = []
+            if (row != 0):
+                moves.append(('up', index - size))
+            if (row != size - 1):
+                moves.append(('down', index + size))
+            if (col != 0):
+                moves.append(('left', index - 1))
+            if (col != size - 1):
+                moves.append(('right', index + 1))
+            table.append(moves)
+        MOVE_TABLE_CACHE[size] = table
+    return MOVE_TABLE_CACHE[size]
+
+
+class CompactEightPuzzleState(object):
+    """
+    A memory efficient alternative to EightPuzzleState.
+
+    The board is stored as a single immutable tuple of numbers in row-major
+    order, so a move only builds one new tuple instead of copying every row,
+    and equality and hashing use an incrementally updated Zobrist key (see
+    EightPuzzleState) before falling back to the tuple.  Legal moves come
+    from a table shared by all states of the same size.
+
+    The class offers the same interface as EightPuzzleState (legalMoves,
+    result, isGoal, cells, blankLocation and manhattan), so it can be used as the start
+    state of an EightPuzzleSearchProblem.
+    """
+    __slots__ = ('size', 'tiles', 'blankIndex', 'zobrist', 'manhattan')
+
+    def __init__(self, numbers, size):
+        """
+            numbers: the numbers of the puzzle in row-major order, 0 being
+            the blank space (see EightPuzzleState)
+            size: the size of the puzzle
+        """
+        self.size = size
+        self.tiles = tuple(numbers)
+        self.blankIndex = self.tiles.index(0)
+        keys = getZobristTable(size)
+        distances = getManhattanTable(size)
+        self.zobrist = 0
+        self.manhattan = 0
+        for index in range(len(self.tiles)):
+            self.zobrist ^= keys[index][self.tiles[index]]
+            self.manhattan += distances[index][self.tiles[index]]
+
+    def fromState(state):
+        "Builds a compact copy of an EightPuzzleState."
+        numbers = []
+        for row in state.cells:
+            numbers.extend(row)
+        return CompactEightPuzzleState(numbers, state.size)
+    fromState = staticmethod(fromState)
+
+    def getCells(self):
+        size = self.size
+        return [list(self.tiles[row * size:(row + 1) * size]) for row in range(size)]
+    cells = property(getCells)
+
+    def getBlankLocation(self):
+        return divmod(self.blankIndex, self.size)
+    blankLocation = property(getBlankLocation)
+
+    def isGoal(self):
+        """
+          Checks to see if the puzzle is in its goal state.
+
+        >>> CompactEightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8], 3).isGoal()
+        True
+        """
+        current = 0
+        for number in self.tiles:
+            if current != number:
+                return False
+            current += 1
+        return True
+
+    def legalMoves(self):
+        """
+          Returns a list of legal moves from the current state.
+
+        >>> CompactEightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8], 3).legalMoves()
+        ['down', 'right']
+        """
+        return [move for move, target in getMoveTable(self.size)[self.blankIndex]]
+
+    def result(self, move):
+        """
+          Returns a new state with the blank moved in the given direction.
+        This function *does not* change the current object.
+        """
+        for legalMove, target in getMoveTable(self.size)[self.blankIndex]:
+            if legalMove == move:
+                break
+        else:
+            raise Exception("Illegal Move")
+
+        tiles = list(self.tiles)
+        number = tiles[target]
+        tiles[self.blankIndex] = number
+        tiles[target] = 0
+
+        keys = getZobristTable(self.size)
+        newPuzzle = CompactEightPuzzleState.__new__(CompactEightPuzzleState)
+        newPuzzle.size = self.size
+        newPuzzle.tiles = tuple(tiles)
+        newPuzzle.blankIndex = target
+        newPuzzle.zobrist = self.zobrist ^ keys[target][number] ^ keys[self.blankIndex][number]
+        distances = getManhattanTable(self.size)
+        newPuzzle.manhattan = self.manhattan + distances[self.blankIndex][number] - distances[target][number]
+        return newPuzzle
+
+    def __eq__(self, other):
+        if self.zobrist != other.zobrist:
+            return False
+        if isinstance(other, CompactEightPuzzleState):
+            return self.tiles == other.tiles
+        return self.cells == other.cells
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.zobrist
+
+    def __str__(self):
+        return str(EightPuzzleState(list(self.tiles), self.size))
+
+
+def isSolvable(puzzle):
+    """
+        Checks whether the goal can be reached from the puzzle.
+
+        Horizontal moves never change the order of the numbers.  A vertical
+        move jumps a number over size - 1 others, which flips the parity of
+        the number of inversions when size is even and keeps it when size is
+        odd.  So the parity of the inversions (plus the row of the blank for
+        even sizes) never changes, and it is even in the goal.
+
+      >>> isSolvable(EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8], 3))
+      True
+      >>> isSolvable(EightPuzzleState([0, 2, 1, 3, 4, 5, 6, 7, 8], 3))
+      False
+    """
+    numbers = [number for row in puzzle.cells for number in row if number != 0]
+    inversions = 0
+    for i in range(len(numbers)):
+        for j in range(i + 1, len(numbers)):
+            if numbers[i] > numbers[j]:
+                inversions += 1
+    if puzzle.size % 2 == 1:
+        return inversions % 2 == 0
+    return (inversions + puzzle.blankLocation[0]) % 2 == 0
+
+
 class EightPuzzleSearchProblem(search.SearchProblem):
     """
         Implementation of a SearchProblem for the  Eight Puzzle domain
@@ -202,19 +517,40 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         "Creates a new EightPuzzleSearchProblem which stores search information."
         self.puzzle = puzzle
         self.size = size
+        self._expanded = 0 # Number of search nodes expanded
 
     def getStartState(self):
         return self.puzzle
 
+    def isSolvable(self):
+        "Returns False if no sequence of moves reaches the goal (see isSolvable)."
+        return isSolvable(self.puzzle)
+
     def isGoalState(self, state):
         return state.isGoal()
 
+    def getGoalState(self):
+        return self.puzzle.__class__(range(0, self.size ** 2), self.size)
+
+    def getPredecessors(self, state):
+        """
+            Returns list of (predecessor, action, stepCost) triples.  Moves
+            are reversible, so the predecessors are the successors and the
+            action leading back is the reverse move.
+        """
+        self._expanded += 1
+        pred = []
+        for a in state.legalMoves():
+            pred.append((state.result(a), REVERSE_MOVES[a], 1))
+        return pred
+
     def getSuccessors(self, state):
         """
             Returns list of (successor, action, stepCost) pairs where
             each succesor is either left, right, up, or down
             from the original state and the cost is 1.0 for each
         """
+        self._expanded += 1
         succ = []
         for a in state.legalMoves():
             succ.append((state.result(a), a, 1))
@@ -229,6 +565,45 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+    # Packed integer encoding used by search.compactAStarSearch: the number
+    # at board index i is stored in bits [i * bits, (i + 1) * bits), which
+    # fits a 15 puzzle in 64 bits
+    def encodeState(self, state):
+        bits = (self.size ** 2 - 1).bit_length()
+        code, shift = 0, 0
+        for number in eightPuzzleAgents.getNumbers(state):
+            code |= number << shift
+            shift += bits
+        return code
+
+    def decodeState(self, code):
+        bits = (self.size ** 2 - 1).bit_length()
+        mask = (1 << bits) - 1
+        numbers = []
+        for i in range(self.size ** 2):
+            numbers.append(code & mask)
+            code >>= bits
+        return self.puzzle.__class__(numbers, self.size)
+
+    # In-place interface used by search.iterativeDeepeningAStarSearch
+    def getMutableStartState(self):
+        "Returns a fresh EightPuzzleState that the search may move in place."
+        return EightPuzzleState(list(itertools.chain(*self.puzzle.cells)), self.size)
+
+    def getActions(self, state):
+        self._expanded += 1
+        return state.legalMoves()
+
+    def doAction(self, state, action):
+        state.move(action)
+        return 1
+
+    def undoAction(self, state, action):
+        state.move(REVERSE_MOVES[action])
+
+    def reverseAction(self, action):
+        return REVERSE_MOVES[action]
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
@@ -316,6 +691,12 @@ def readCommand(argv):
     parser.add_option('--moves', type='int', dest='moves',
                       help=default('Shuffles the correct puzzle solution with MOVES legal moves to create random puzzle'),
                       default=30)
+    parser.add_option('-c', '--compact', action='store_true', dest='compact',
+                      help=default('Search over compact (tuple backed) puzzle states'),
+                      default=False)
+    parser.add_option('-w', '--watch', type='int', dest='watch',
+                      help=default('Shows every WATCH-th state expanded while searching (0 to not show the search)'),
+                      default=0)
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
         raise Exception('Command line input not understood: ' + str(otherjunk))
@@ -329,8 +710,9 @@ def readCommand(argv):
     if options.moves < 0: parser.error('The number of moves should be positive')
     if options.size != 3 and options.load >= 0: parser.error('size must be 3 to use the stored puzzles')
     if options.load > 5: parser.error('There are 6 puzzle stored, numbered from 0 to 5')
-    if options.agent < 0: parser.error('Agent is a value between 0 and 8')
-    if options.agent > 8: parser.error('Agent is a value between 0 and 8')
+    if options.agent < 0: parser.error('Agent is a value between 0 and 20')
+    if options.agent > 20: parser.error('Agent is a value between 0 and 20')
+    if options.watch < 0: parser.error('The watch interval should be positive')
 
     args['size'] = options.size
     args['width'] = options.width
@@ -340,14 +722,43 @@ def readCommand(argv):
     args['load'] = options.load
     args['moves'] = options.moves
     args['agent'] = options.agent
+    args['compact'] = options.compact
+    args['watch'] = options.watch
 
     return args
 
 
-def runGame(size, width, height, frames, textGraphics, load, moves, agent):
+def watchSearch(problem, agent, watch, display=None):
+    """
+    Runs the search of the agent step by step, showing every watch-th
+    state expanded on the display, or printing it without one.  Returns
+    the path found, or None for unsolvable puzzles.
+    """
+    steps = eightPuzzleAgents.getSearchSteps(problem, agent)
+    if steps is None: return None
+    expanded, path = 0, None
+    for event in steps:
+        if event.path is not None:
+            path = event.path   # anytime searches may improve on it
+            continue
+        expanded += 1
+        if expanded % watch == 0:
+            message = 'Expanded %d, cost %d, estimate %d, frontier %d' % \
+                      (expanded, event.cost, event.estimate, event.frontierSize)
+            if display is None:
+                print message
+                print event.state
+            else:
+                display.updatePuzzleGraphics(event.state, message)
+    if path is None: util.raiseNotDefined()
+    return path
+
+
+def runGame(size, width, height, frames, textGraphics, load, moves, agent, compact=False, watch=0):
     # create or load a puzzle
     if load >= 0: puzzle = loadEightPuzzle(load)
     else: puzzle = createRandomEightPuzzle(moves, size)
+    if compact: puzzle = CompactEightPuzzleState.fromState(puzzle)
 
     # initialize display
     if not textGraphics:
@@ -359,7 +770,16 @@ def runGame(size, width, height, frames, textGraphics, load, moves, agent):
 
     # find the solution to the puzzle
     problem = EightPuzzleSearchProblem(puzzle, size)
-    path = eightPuzzleAgents.EightPuzzleAgent(problem, agent).searchFunction
+    if watch > 0:
+        if textGraphics: path = watchSearch(problem, agent, watch)
+        else:
+            path = watchSearch(problem, agent, watch, display)
+            display.updatePuzzleGraphics(puzzle, "Starting State: click to continue")
+    else:
+        path = eightPuzzleAgents.EightPuzzleAgent(problem, agent).searchFunction
+    if path is None:
+        print('The puzzle cannot be solved')
+        return
 
     print('The algorithm found a path of %d moves: %s' % (len(path), str(path)))
 
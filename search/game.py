@@ -161,9 +161,14 @@ class AgentState:
 
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.  Data is accessed
-    via grid[x][y] where (x,y) are positions on a Pacman map with x horizontal,
-    y vertical and the origin (0,0) in the bottom left corner.
+    A 2-dimensional array of booleans backed by one bytearray per column.  Data
+    is accessed via grid[x][y] where (x,y) are positions on a Pacman map with x
+    horizontal, y vertical and the origin (0,0) in the bottom left corner.
+    Cells read back as 0 and 1, which test and compare like False and True;
+    a Grid cannot hold any other values.
+
+    Counting, listing, copying, comparing, hashing and bit packing work on
+    whole columns at once instead of cell by cell.
 
     The __str__ method constructs an output that is oriented like a pacman board.
     """
@@ -173,7 +178,7 @@ class Grid:
 
         self.width = width
         self.height = height
-        self.data = [[initialValue for y in range(height)] for x in range(width)]
+        self.data = [bytearray([initialValue]) * height for x in range(width)]
         if bitRepresentation:
             self._unpackBits(bitRepresentation)
 
@@ -181,27 +186,22 @@ class Grid:
         return self.data[i]
 
     def __setitem__(self, key, item):
-        self.data[key] = item
+        self.data[key] = bytearray(item)
 
     def __str__(self):
-        out = [[str(self.data[x][y])[0] for x in range(self.width)] for y in range(self.height)]
+        out = [''.join([x[y] and 'T' or 'F' for x in self.data]) for y in range(self.height)]
         out.reverse()
-        return '\n'.join([''.join(x) for x in out])
+        return '\n'.join(out)
 
     def __eq__(self, other):
         if other == None: return False
         return self.data == other.data
 
+    def __ne__(self, other):
+        return not self == other
+
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
-        h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
-        return hash(h)
+        return hash(str(bytearray().join(self.data)))
 
     def copy(self):
         g = Grid(self.width, self.height)
@@ -217,13 +217,17 @@ class Grid:
         return g
 
     def count(self, item =True ):
-        return sum([x.count(item) for x in self.data])
+        value = item and '\x01' or '\x00'
+        return sum([x.count(value) for x in self.data])
 
     def asList(self, key = True):
+        value = key and '\x01' or '\x00'
         list = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if self[x][y] == key: list.append( (x,y) )
+        for x, column in enumerate(self.data):
+            y = column.find(value)
+            while y >= 0:
+                list.append( (x,y) )
+                y = column.find(value, y + 1)
         return list
 
     def packBits(self):
@@ -232,18 +236,13 @@ class Grid:
 
         (width, height, bitPackedInts...)
         """
-        bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
-        return tuple(bits)
+        # Cells are numbered column by column, CELLS_PER_INT to an int with
+        # the first cell in the highest bit; the last int is always partial
+        cells = str(bytearray().join(self.data)).translate(_BITS_TO_DIGITS)
+        size = self.CELLS_PER_INT
+        cells += '0' * (size - len(cells) % size)
+        return tuple([self.width, self.height] +
+                     [int(cells[i:i + size], 2) for i in range(0, len(cells), size)])
 
     def _cellIndexToPosition(self, index):
         x = index / self.height
@@ -254,25 +253,39 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
         for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
-
-    def _unpackInt(self, packed, size):
-        bools = []
-        if packed < 0: raise ValueError, "must be a positive integer"
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+            if packed < 0: raise ValueError, "must be a positive integer"
+        digits = ''.join([bin(packed)[2:].zfill(self.CELLS_PER_INT) for packed in bits])
+        cells = bytearray(digits[:self.width * self.height].translate(_DIGITS_TO_BITS))
+        self.data = [cells[x * self.height:(x + 1) * self.height] for x in range(self.width)]
+
+_BITS_TO_DIGITS = ''.join([chr(i) for i in range(256)]).replace('\x00', '0').replace('\x01', '1')
+_DIGITS_TO_BITS = ''.join([chr(i) for i in range(256)]).replace('0', '\x00').replace('1', '\x01')
+
+class BitmaskColumn:
+    """
+    A read-only view of column x of a BitmaskGrid, so that grid[x][y] reads
+    a single bit.  The grid is immutable: assigning to a cell raises
+    TypeError; use BitmaskGrid.without instead.
+    """
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        if y < 0: y += self.grid.height
+        if not 0 <= y < self.grid.height: raise IndexError, "column index out of range"
+        return self.grid.isSet(self.x, y)
+
+    def __setitem__(self, y, value):
+        raise TypeError, "BitmaskGrid is immutable; use without(x, y)"
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self.grid.isSet(self.x, y)
 
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
@@ -280,6 +293,95 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class BitmaskGrid:
+    """
+    An immutable set of cells stored as the bits of a single int, one bit per
+    cell listed in cellIndex.  It reads like a Grid of booleans (grid[x][y],
+    count, asList) but hashes and compares in time proportional to the number
+    of cells over the machine word size, and without(x, y) makes a changed
+    copy without copying any lists.
+
+    cellIndex maps every (x, y) that can be set to its bit and is shared by
+    all the grids derived from one another; BitmaskGrid.cellIndex(walls)
+    numbers the open cells of a layout in the order of Grid.asList.
+    """
+    def __init__(self, width, height, cellIndex, cells, bits=0):
+        self.width = width
+        self.height = height
+        self.index = cellIndex    # (x, y) -> bit number
+        self.cells = cells        # bit number -> (x, y)
+        self.bits = bits
+
+    def cellIndex(walls):
+        "Returns (cellIndex, cells) numbering the open cells of walls."
+        cells = walls.asList(False)
+        return dict([(cell, i) for i, cell in enumerate(cells)]), cells
+    cellIndex = staticmethod(cellIndex)
+
+    def fromGrid(grid, walls):
+        "Returns the BitmaskGrid of a Grid whose True cells are all open in walls."
+        index, cells = BitmaskGrid.cellIndex(walls)
+        bits = 0
+        for cell in grid.asList():
+            bits |= 1 << index[cell]
+        return BitmaskGrid(grid.width, grid.height, index, cells, bits)
+    fromGrid = staticmethod(fromGrid)
+
+    def __getitem__(self, x):
+        return BitmaskColumn(self, x)
+
+    def isSet(self, x, y):
+        bit = self.index.get((x, y))
+        return bit is not None and (self.bits >> bit) & 1 == 1
+
+    def without(self, x, y):
+        "Returns the grid with (x, y) cleared; self if it was not set."
+        bit = self.index.get((x, y))
+        if bit is None or not (self.bits >> bit) & 1:
+            return self
+        return BitmaskGrid(self.width, self.height, self.index, self.cells, self.bits & ~(1 << bit))
+
+    def count(self, item=True):
+        setBits = bin(self.bits).count('1')
+        if item: return setBits
+        return self.width * self.height - setBits
+
+    def asList(self, key=True):
+        if not key:
+            return [(x, y) for x in range(self.width) for y in range(self.height) if not self.isSet(x, y)]
+        list = []
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            list.append(self.cells[lowest.bit_length() - 1])
+            bits ^= lowest
+        return list
+
+    def copy(self):
+        return BitmaskGrid(self.width, self.height, self.index, self.cells, self.bits)
+
+    def deepCopy(self):
+        return self.copy()
+
+    def toGrid(self):
+        grid = Grid(self.width, self.height)
+        for x, y in self.asList():
+            grid[x][y] = True
+        return grid
+
+    def __eq__(self, other):
+        if not isinstance(other, BitmaskGrid): return False
+        return self.bits == other.bits and self.index is other.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __str__(self):
+        return str(self.toGrid())
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -370,19 +472,35 @@ class Actions:
 
 class GameStateData:
     """
-
+    The data of a game state.  Successors share the layout, food grid,
+    capsule list and agent states of their predecessor and only copy them
+    when they are first changed, so the rules must change them through
+    getAgentStateForWrite, getFoodForWrite and getCapsulesForWrite.  The
+    layout is never changed and is shared by every state of a game.
     """
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            # The predecessor shares them now too, so neither side may
+            # write to them in place any more
+            prevState._ownFood = False
+            prevState._ownCapsules = False
+            prevState._ownAgentStates = None
+            prevState._ownEaten = False
+
+        # Everything taken from the predecessor is still shared with it
+        self._ownFood = False
+        self._ownCapsules = False
+        self._ownAgentStates = None     # which agent states are copies, once the list is one
+        self._ownEaten = False
 
         self._foodEaten = None
         self._foodAdded = None
@@ -394,14 +512,46 @@ class GameStateData:
 
     def deepCopy( self ):
         state = GameStateData( self )
-        state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
         return state
 
+    def getAgentStateForWrite( self, index ):
+        """
+        Returns the AgentState of agent index, copying it first if it is
+        still shared with the predecessor.
+        """
+        if self._ownAgentStates is None:
+            self.agentStates = self.agentStates[:]
+            self._ownAgentStates = [False] * len(self.agentStates)
+        if not self._ownAgentStates[index]:
+            self.agentStates[index] = self.agentStates[index].copy()
+            self._ownAgentStates[index] = True
+        return self.agentStates[index]
+
+    def getFoodForWrite( self ):
+        "Returns the food grid, copying it first if it is still shared."
+        if not self._ownFood:
+            self.food = self.food.copy()
+            self._ownFood = True
+        return self.food
+
+    def getCapsulesForWrite( self ):
+        "Returns the capsule list, copying it first if it is still shared."
+        if not self._ownCapsules:
+            self.capsules = self.capsules[:]
+            self._ownCapsules = True
+        return self.capsules
+
+    def getEatenForWrite( self ):
+        "Returns the list of eaten agents, copying it first if it is still shared."
+        if not self._ownEaten:
+            self._eaten = self._eaten[:]
+            self._ownEaten = True
+        return self._eaten
+
     def copyAgentStates( self, agentStates ):
         copiedStates = []
         for agentState in agentStates:
@@ -434,7 +584,7 @@ class GameStateData:
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
-        map = Grid(width, height)
+        map = [[' '] * height for x in range(width)]
         if type(self.food) == type((1,2)):
             self.food = reconstituteGrid(self.food)
         for x in range(width):
@@ -455,7 +605,9 @@ class GameStateData:
         for x, y in self.capsules:
             map[x][y] = 'o'
 
-        return str(map) + ("\nScore: %d\n" % self.score)
+        out = [''.join([map[x][y] for x in range(width)]) for y in range(height)]
+        out.reverse()
+        return '\n'.join(out) + ("\nScore: %d\n" % self.score)
 
     def _foodWallStr( self, hasFood, hasWall ):
         if hasFood:
@@ -503,6 +655,10 @@ class GameStateData:
                 else: numGhosts += 1
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
+        self._ownFood = True
+        self._ownCapsules = True
+        self._ownAgentStates = [True] * len(self.agentStates)
+        self._ownEaten = True
 
 try:
     import boinc
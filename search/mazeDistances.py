@@ -0,0 +1,120 @@
+"""
+All-pairs maze distances for a layout.
+
+A breadth first search from every open cell gives the length of the
+shortest path between any two cells, stored as one unsigned short per pair
+in a flat array.  Tables are written to MAZE_DISTANCE_DIR under a hash of
+the walls and read back on later runs, so each layout is only searched
+once.  After that a distance query is two dictionary lookups and an array
+access.
+"""
+
+import os
+import array
+import hashlib
+
+MAZE_DISTANCE_DIR = 'distances'
+UNREACHABLE = 65535
+
+
+class MazeDistances:
+    """
+    The distances between all open cells of a walls Grid.  Cells are
+    numbered column by column, in the order of walls.asList(False).
+    """
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.cells = walls.asList(False)
+        self.index = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.table = None
+
+    def getKey(self):
+        "A hash of the walls that names the table on disk."
+        return hashlib.sha1(repr(self.walls.packBits())).hexdigest()
+
+    def getFileName(self):
+        return os.path.join(MAZE_DISTANCE_DIR, self.getKey() + '.dist')
+
+    def load(self):
+        """
+        Reads the table from disk, building and saving it first if it does
+        not exist yet.
+        """
+        fileName = self.getFileName()
+        numCells = len(self.cells)
+        if os.path.exists(fileName):
+            table = array.array('H')
+            f = open(fileName, 'rb')
+            try:
+                table.fromfile(f, numCells * numCells)
+                self.table = table
+                return self
+            except EOFError:
+                pass    # a truncated table is built again
+            finally:
+                f.close()
+
+        self.table = self.build()
+        try:
+            if not os.path.exists(MAZE_DISTANCE_DIR): os.mkdir(MAZE_DISTANCE_DIR)
+            f = open(fileName, 'wb')
+            try: self.table.tofile(f)
+            finally: f.close()
+        except (IOError, OSError):
+            pass    # keep the table in memory only
+        return self
+
+    def build(self):
+        "Computes the table with a breadth first search from every cell."
+        numCells = len(self.cells)
+        neighbors = []
+        for x, y in self.cells:
+            neighbors.append([self.index[cell] for cell in [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+                              if cell in self.index])
+
+        table = array.array('H', [UNREACHABLE]) * (numCells * numCells)
+        for source in range(numCells):
+            row = source * numCells
+            table[row + source] = 0
+            layer, distance = [source], 0
+            while layer:
+                distance += 1
+                nextLayer = []
+                for cell in layer:
+                    for neighbor in neighbors[cell]:
+                        if table[row + neighbor] == UNREACHABLE:
+                            table[row + neighbor] = distance
+                            nextLayer.append(neighbor)
+                layer = nextLayer
+        return table
+
+    def distance(self, point1, point2):
+        """
+        Returns the length of the shortest path between two open cells, or
+        float('inf') if there is none.
+        """
+        distance = self.table[self.index[point1] * len(self.cells) + self.index[point2]]
+        if distance == UNREACHABLE: return float('inf')
+        return distance
+
+
+MAZE_DISTANCE_CACHE = {}     # hash of the walls -> MazeDistances
+WALLS_CACHE = {}             # id of a walls Grid -> (walls, MazeDistances)
+
+def getMazeDistances(walls):
+    """
+    Returns the loaded MazeDistances of a walls Grid, computing them only
+    once per process for the same walls.
+    """
+    # Game states of one layout share their walls Grid, which makes the
+    # object identity a cheap key; the hash of the walls catches equal copies
+    entry = WALLS_CACHE.get(id(walls))
+    if entry is not None and entry[0] is walls:
+        return entry[1]
+    distances = MazeDistances(walls)
+    key = distances.getKey()
+    if key not in MAZE_DISTANCE_CACHE:
+        MAZE_DISTANCE_CACHE[key] = distances.load()
+    WALLS_CACHE[id(walls)] = (walls, MAZE_DISTANCE_CACHE[key])
+    return MAZE_DISTANCE_CACHE[key]
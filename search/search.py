@@ -18,6 +18,12 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import heapq
+import time
+try:
+    import resource
+except ImportError:
+    resource = None  # not available on Windows
 
 class SearchProblem:
     """
@@ -62,6 +68,193 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
+class SearchStatistics:
+    """
+    Collects what a search algorithm did.  Pass an instance as the stats
+    argument of a search function; it is filled in during the search:
+
+      expanded        states whose successors were generated
+      generated       successors generated
+      duplicates      pushes of states that were already pushed before
+      maxFrontier     largest number of nodes waiting in the frontier
+      maxClosed       largest number of states in the closed set
+      heuristicCalls  calls to the heuristic
+      heuristicTime   seconds spent in the heuristic
+      peakMemory      peak resident memory of the process in kilobytes
+                      (None where the resource module is missing)
+      phaseTimes      wall time in seconds per phase: 'setup', 'search'
+                      and 'path', plus 'expand' for the time spent
+                      generating successors inside 'search'
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.maxFrontier = 0
+        self.maxClosed = 0
+        self.heuristicCalls = 0
+        self.heuristicTime = 0.0
+        self.peakMemory = None
+        self.phaseTimes = {}
+        self.phaseStarts = {}
+
+    def startPhase(self, phase):
+        self.phaseStarts[phase] = time.time()
+
+    def stopPhase(self, phase):
+        elapsed = time.time() - self.phaseStarts.pop(phase)
+        self.phaseTimes[phase] = self.phaseTimes.get(phase, 0.0) + elapsed
+
+    def switchPhase(self, phase):
+        "Stops every running phase and starts the given one."
+        for running in self.phaseStarts.keys():
+            self.stopPhase(running)
+        self.startPhase(phase)
+
+    def countedHeuristic(self, heuristic):
+        "Returns heuristic wrapped to count its calls and time."
+        def counted(state, problem=None):
+            start = time.time()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += 1
+            return value
+        return counted
+
+    def countedExpansion(self, expand):
+        """
+        Returns expand (e.g. problem.getSuccessors) wrapped to count the
+        expansions, the successors generated and the time spent.
+        """
+        def counted(state):
+            start = time.time()
+            successors = expand(state)
+            self.phaseTimes['expand'] = self.phaseTimes.get('expand', 0.0) + time.time() - start
+            self.expanded += 1
+            self.generated += len(successors)
+            return successors
+        return counted
+
+    def observe(self, frontierSize, closedSize):
+        if frontierSize > self.maxFrontier: self.maxFrontier = frontierSize
+        if closedSize > self.maxClosed: self.maxClosed = closedSize
+
+    def finish(self):
+        "Stops the running phases and records the peak memory."
+        for running in self.phaseStarts.keys():
+            self.stopPhase(running)
+        if resource is not None:
+            self.peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def asDict(self):
+        "Returns the statistics as a dictionary, e.g. for logging as JSON."
+        keys = ['expanded', 'generated', 'duplicates', 'maxFrontier', 'maxClosed',
+                'heuristicCalls', 'heuristicTime', 'peakMemory', 'phaseTimes']
+        return dict([(key, getattr(self, key)) for key in keys])
+
+    def __str__(self):
+        lines = ['Expanded: %d' % self.expanded,
+                 'Generated: %d' % self.generated,
+                 'Duplicate pushes: %d' % self.duplicates,
+                 'Max frontier size: %d' % self.maxFrontier,
+                 'Max closed set size: %d' % self.maxClosed,
+                 'Heuristic calls: %d (%.3f seconds)' % (self.heuristicCalls, self.heuristicTime)]
+        if self.peakMemory is not None:
+            lines.append('Peak memory: %d KB' % self.peakMemory)
+        for phase in sorted(self.phaseTimes.keys()):
+            lines.append('Time in %s: %.3f seconds' % (phase, self.phaseTimes[phase]))
+        return '\n'.join(lines)
+
+
+class SearchBudgetExceeded(Exception):
+    """
+    Raised by a search function that ran out of its SearchBudget.
+
+      reason  'nodes', 'seconds' or 'memory'
+      path    the actions leading to the state that was about to be
+              expanded, the most promising partial solution known
+      stats   the SearchStatistics passed to the search, or None
+    """
+
+    def __init__(self, reason, path, stats=None):
+        Exception.__init__(self, 'Search budget exceeded: ' + reason)
+        self.reason = reason
+        self.path = path
+        self.stats = stats
+
+
+def residentMemory():
+    """
+    Returns the resident memory of the process in kilobytes as it is right
+    now, read from /proc/self/statm.  Where there is no /proc the peak from
+    the resource module stands in for it, and None where neither exists.
+    """
+    try:
+        statm = open('/proc/self/statm')
+        try:
+            pages = int(statm.read().split()[1])
+        finally:
+            statm.close()
+        return pages * resource.getpagesize() / 1024
+    except (IOError, IndexError, ValueError, AttributeError):
+        if resource is None: return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class SearchBudget:
+    """
+    Limits on the work of a single search.  Pass an instance as the budget
+    argument of a search function; once a limit is passed the search raises
+    SearchBudgetExceeded.
+
+      maxNodes    states expanded
+      maxSeconds  wall time
+      maxMemory   growth of the resident memory of the process since the
+                  search started, in kilobytes (only enforced where
+                  residentMemory can measure it)
+
+    Nodes are checked on every expansion, time and memory every
+    checkInterval expansions.  A budget can be reused; every search starts
+    it afresh.
+    """
+
+    def __init__(self, maxNodes=None, maxSeconds=None, maxMemory=None, checkInterval=256):
+        self.maxNodes = maxNodes
+        self.maxSeconds = maxSeconds
+        self.maxMemory = maxMemory
+        self.checkInterval = checkInterval
+        self.start()
+
+    def start(self):
+        self.nodes = 0
+        self.startTime = time.time()
+        self.reason = None
+        if self.maxMemory is not None:
+            self.startMemory = residentMemory()
+
+    def spend(self):
+        """
+        Accounts for one expansion.  Returns True, with the exceeded limit
+        in self.reason, once the budget is used up.
+        """
+        self.nodes += 1
+        if self.maxNodes is not None and self.nodes > self.maxNodes:
+            self.reason = 'nodes'
+        elif self.nodes % self.checkInterval == 0:
+            if self.maxSeconds is not None and time.time() - self.startTime > self.maxSeconds:
+                self.reason = 'seconds'
+            elif self.maxMemory is not None and self.startMemory is not None:
+                if residentMemory() - self.startMemory > self.maxMemory:
+                    self.reason = 'memory'
+        return self.reason is not None
+
+    def exceeded(self, path, stats=None):
+        "Raises SearchBudgetExceeded for the given partial path."
+        if stats is not None: stats.finish()
+        raise SearchBudgetExceeded(self.reason, path, stats)
+
+
 def tinyMazeSearch(problem):
     """
     Returns a sequence of moves that solves tinyMaze.  For any other maze, the
@@ -72,73 +265,167 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def depthFirstSearch(problem):
-    """Search the deepest nodes in the search tree first."""
+def reconstructPath(node):
+    """
+    Follows the parent pointers of a search node back to the start state and
+    returns the actions taken along the way.
+    """
     path = []
-    visited = []
-    myStack = util.Stack()
-    myStack.push((problem.getStartState(), []))
+    while node[2] is not None:
+        path.append(node[1])
+        node = node[2]
+    path.reverse()
+    return path
+
+def graphSearch(problem, frontier, stats=None, budget=None):
+    """
+    Searches the nodes of problem in the order given by frontier, never
+    expanding a state twice.
+
+    Search nodes are (state, action, parent, cost) tuples where parent is the
+    node the action was taken from and cost is the cost of the path to
+    state.  The path is only built from the parent pointers once a goal is
+    found, and the states already expanded are kept in a set.
+
+    stats: an optional SearchStatistics to fill in
+    budget: an optional SearchBudget to stay within
+    """
+    if stats is not None:
+        return instrumentedGraphSearch(problem, frontier, stats, budget)
+    if budget is not None: budget.start()
+    visited = set()
+    frontier.push((problem.getStartState(), None, None, 0))
+    bulk = 'extend' in dir(frontier)
 
-    while not myStack.isEmpty():
-        current, path = myStack.pop()
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        current, currentCost = node[0], node[3]
         if current not in visited:
-            visited.append(current)
+            visited.add(current)
 
             if problem.isGoalState(current):
-                return path
+                return reconstructPath(node)
+            if budget is not None and budget.spend():
+                budget.exceeded(reconstructPath(node))
 
             successors = problem.getSuccessors(current)
+            if bulk:
+                frontier.extend([(nextLocation, nextDirection, node, currentCost + cost)
+                                 for nextLocation, nextDirection, cost in successors
+                                 if nextLocation not in visited])
+                continue
             for nextLocation, nextDirection, cost in successors:
                 if nextLocation not in visited:
-                    myStack.push((nextLocation, path + [nextDirection]))
+                    frontier.push((nextLocation, nextDirection, node, currentCost + cost))
 
     util.raiseNotDefined()
 
-def breadthFirstSearch(problem):
-    """Search the shallowest nodes in the search tree first."""
-    path = []
-    visited = []
-    myQueue = util.Queue()
-    myQueue.push((problem.getStartState(), []))
+def instrumentedGraphSearch(problem, frontier, stats, budget=None):
+    """
+    graphSearch, filling in stats as it goes.  Kept apart so the plain
+    search does not pay for the bookkeeping.
+    """
+    stats.switchPhase('setup')
+    if budget is not None: budget.start()
+    getSuccessors = stats.countedExpansion(problem.getSuccessors)
+    start = problem.getStartState()
+    visited, pushed = set(), set([start])
+    frontier.push((start, None, None, 0))
 
-    while not myQueue.isEmpty():
-        current, path = myQueue.pop()
+    stats.switchPhase('search')
+    while not frontier.isEmpty():
+        stats.observe(len(frontier), len(visited))
+        node = frontier.pop()
+        current, currentCost = node[0], node[3]
         if current not in visited:
-            visited.append(current)
+            visited.add(current)
+
             if problem.isGoalState(current):
+                stats.switchPhase('path')
+                path = reconstructPath(node)
+                stats.finish()
                 return path
+            if budget is not None and budget.spend():
+                budget.exceeded(reconstructPath(node), stats)
 
-            successors = problem.getSuccessors(current)
-
-            for nextLocation, nextDirection, cost in successors:
+            for nextLocation, nextDirection, cost in getSuccessors(current):
                 if nextLocation not in visited:
-                    myQueue.push((nextLocation, path + [nextDirection]))
+                    if nextLocation in pushed:
+                        stats.duplicates += 1
+                    else:
+                        pushed.add(nextLocation)
+                    frontier.push((nextLocation, nextDirection, node, currentCost + cost))
 
+    stats.finish()
     util.raiseNotDefined()
 
-def uniformCostSearch(problem):
-    """Search the node of least total cost first."""
-    path = []
-    visited = []
-    myPriorityQueue = util.PriorityQueue()
-    myPriorityQueue.push((problem.getStartState(), [], 0), 0)
+def bestFirstSearch(problem, priorityFunction, stats=None, budget=None):
+    """
+    Searches the state of lowest priority first, keeping at most one frontier
+    entry per state in a util.IndexedPriorityQueue.  When a cheaper path to a
+    queued state is found its node is replaced and its priority lowered in
+    place, instead of queueing a second copy of the state.
 
-    while not myPriorityQueue.isEmpty():
-        current, path, currentCost = myPriorityQueue.pop()
-        if current not in visited:
-            visited.append(current)
+    priorityFunction(state, cost) gives the priority of reaching state with
+    the given path cost.  Nodes are the (state, action, parent, cost) tuples
+    of graphSearch.  Lowering the priority of a queued state counts as a
+    duplicate push in stats.
+    """
+    if stats is not None:
+        stats.switchPhase('setup')
+        getSuccessors = stats.countedExpansion(problem.getSuccessors)
+    else:
+        getSuccessors = problem.getSuccessors
+    if budget is not None: budget.start()
+    start = problem.getStartState()
+    nodes = {start: (start, None, None, 0)}   # cheapest node found per state
+    visited = set()
+    frontier = util.IndexedPriorityQueue()
+    frontier.push(start, priorityFunction(start, 0))
 
-            if problem.isGoalState(current):
-                return path
+    if stats is not None: stats.switchPhase('search')
+    while not frontier.isEmpty():
+        if stats is not None: stats.observe(len(frontier), len(visited))
+        current = frontier.pop()
+        node = nodes[current]
+        visited.add(current)
 
-            successors = problem.getSuccessors(current)
-            for nextLocation, nextDirection, cost in successors:
-                if nextLocation not in visited:
-                    priority = currentCost + cost
-                    myPriorityQueue.push((nextLocation, path + [nextDirection], priority), priority)
+        if problem.isGoalState(current):
+            if stats is None:
+                return reconstructPath(node)
+            stats.switchPhase('path')
+            path = reconstructPath(node)
+            stats.finish()
+            return path
+        if budget is not None and budget.spend():
+            budget.exceeded(reconstructPath(node), stats)
+
+        successors = getSuccessors(current)
+        for nextLocation, nextDirection, cost in successors:
+            if nextLocation not in visited:
+                newCost = node[3] + cost
+                if nextLocation in frontier:
+                    if nodes[nextLocation][3] <= newCost:
+                        continue
+                    if stats is not None: stats.duplicates += 1
+                nodes[nextLocation] = (nextLocation, nextDirection, node, newCost)
+                frontier.update(nextLocation, priorityFunction(nextLocation, newCost))
 
+    if stats is not None: stats.finish()
     util.raiseNotDefined()
 
+def depthFirstSearch(problem, stats=None, budget=None):
+    """Search the deepest nodes in the search tree first."""
+    return graphSearch(problem, util.Stack(), stats, budget)
+
+def breadthFirstSearch(problem, stats=None, budget=None):
+    """Search the shallowest nodes in the search tree first."""
+    return graphSearch(problem, util.Queue(), stats, budget)
+
+def uniformCostSearch(problem, stats=None, budget=None):
+    """Search the node of least total cost first."""
+    return bestFirstSearch(problem, lambda state, cost: cost, stats, budget)
+
 def nullHeuristic(state, problem=None):
     """
     A heuristic function estimates the cost from the current state to the nearest
@@ -146,33 +433,801 @@ def nullHeuristic(state, problem=None):
     """
     return 0
 
-def aStarSearch(problem, heuristic=nullHeuristic):
+def aStarSearch(problem, heuristic=nullHeuristic, stats=None, budget=None):
     """Search the node that has the lowest combined cost and heuristic first."""
+    if stats is not None: heuristic = stats.countedHeuristic(heuristic)
+    return bestFirstSearch(problem, lambda state, cost: cost + heuristic(state, problem), stats, budget)
+
+def bucketUniformCostSearch(problem, stats=None, budget=None):
+    """
+    Uniform cost search over a util.BucketPriorityQueue, for problems whose
+    step costs are non-negative integers.
+    """
+    return graphSearch(problem, util.BucketPriorityQueueWithFunction(lambda node: node[3]), stats, budget)
+
+def bucketAStarSearch(problem, heuristic=nullHeuristic, stats=None, budget=None):
+    """
+    A* search over a util.BucketPriorityQueue, for problems whose step costs
+    and heuristic values are non-negative integers.  Nodes of equal f are
+    ordered by h, lowest first, and the most recently generated first among
+    those, so the search dives towards the goal within an f layer.
+    """
+    if stats is not None: heuristic = stats.countedHeuristic(heuristic)
+    def priorityFunction(node):
+        h = heuristic(node[0], problem)
+        return node[3] + h, h
+    return graphSearch(problem, util.BucketPriorityQueueWithFunction(priorityFunction), stats, budget)
+
+class CompactSearchTable(util.IntegerHashTable):
+    """
+    The util.IntegerHashTable of compactAStarSearch: for every packed state
+    its path cost, the code of its parent and the action leading from the
+    parent, and whether it was expanded.  Parent codes are stored plus one
+    (0 for the start) as two 32 bit halves.
+    """
+
+    def __init__(self):
+        util.IntegerHashTable.__init__(self, 'IIIBB')
+        self.costs, self.lowParents, self.highParents, self.actionIndices, self.closed = self.fields
+        self.actions, self.actionIndex = [], {}
+
+    def setParent(self, slot, parentCode, action):
+        if action not in self.actionIndex:
+            self.actionIndex[action] = len(self.actions)
+            self.actions.append(action)
+        self.lowParents[slot] = (parentCode + 1) & 0xFFFFFFFF
+        self.highParents[slot] = (parentCode + 1) >> 32
+        self.actionIndices[slot] = self.actionIndex[action]
+
+    def path(self, code):
+        "Returns the actions leading from the start to the state code."
+        actions = []
+        slot = self.slot(code)
+        parent = self.highParents[slot] << 32 | self.lowParents[slot]
+        while parent != 0:
+            actions.append(self.actions[self.actionIndices[slot]])
+            slot = self.slot(parent - 1)
+            parent = self.highParents[slot] << 32 | self.lowParents[slot]
+        actions.reverse()
+        return actions
+
+def compactAStarSearch(problem, heuristic=nullHeuristic, stats=None, budget=None):
+    """
+    A* search that keeps states packed as integers, for searches too large
+    to hold every state object in memory.  The problem must define
+    encodeState(state), returning an integer in [0, 2 ** 64 - 1), and its
+    inverse decodeState(code); states are only decoded to be expanded.
+
+    The path cost, parent and last action of every state reached live in a
+    util.IntegerHashTable and the frontier is a util.BucketPriorityQueue of
+    codes ordered by f with ties on h, so step costs and heuristic values
+    must be non-negative integers.  The heuristic should be consistent,
+    since expanded states are never reopened.  Actions are stored as their
+    index in a list of the distinct actions seen, of which there may be at
+    most 256.
+    """
+    getSuccessors = problem.getSuccessors
+    if stats is not None:
+        stats.switchPhase('setup')
+        getSuccessors = stats.countedExpansion(getSuccessors)
+        heuristic = stats.countedHeuristic(heuristic)
+    if budget is not None: budget.start()
+    encode, decode = problem.encodeState, problem.decodeState
+
+    table = CompactSearchTable()
+    costs, closed = table.costs, table.closed
+    start = problem.getStartState()
+    startCode = encode(start)
+    table.add(startCode)
+    estimate = heuristic(start, problem)
+    frontier = util.BucketPriorityQueue()
+    frontier.push(startCode, estimate, estimate)
+
+    if stats is not None: stats.switchPhase('search')
+    while not frontier.isEmpty():
+        if stats is not None: stats.observe(len(frontier), len(table))
+        code = frontier.pop()
+        slot = table.slot(code)
+        if closed[slot]:
+            continue
+        closed[slot] = 1
+        state, cost = decode(code), costs[slot]
+
+        if problem.isGoalState(state):
+            if stats is not None: stats.switchPhase('path')
+            actions = table.path(code)
+            if stats is not None: stats.finish()
+            return actions
+        if budget is not None and budget.spend():
+            budget.exceeded(table.path(code), stats)
+
+        for nextState, action, stepCost in getSuccessors(state):
+            nextCode, nextCost = encode(nextState), cost + stepCost
+            nextSlot = table.slot(nextCode)
+            if nextSlot >= 0:
+                if closed[nextSlot] or costs[nextSlot] <= nextCost:
+                    continue
+                if stats is not None: stats.duplicates += 1
+            else:
+                nextSlot = table.add(nextCode)
+            costs[nextSlot] = nextCost
+            table.setParent(nextSlot, code, action)
+            estimate = heuristic(nextState, problem)
+            frontier.push(nextCode, nextCost + estimate, estimate)
+
+    if stats is not None: stats.finish()
+    util.raiseNotDefined()
+
+def iterativeDeepeningAStarSearch(problem, heuristic=nullHeuristic, stats=None, budget=None):
+    """
+    Search depth first up to a bound on cost plus heuristic, raising the bound
+    to the smallest value that exceeded it until a goal is found.  Only the
+    current path is kept in memory.
+
+    Problems that define getMutableStartState, getActions, doAction,
+    undoAction and reverseAction are searched on a single state that is
+    changed in place, and the action undoing the previous one is never
+    tried.  Other problems use getSuccessors and skip the states already on
+    the current path.  In stats, the frontier is the current path.
+    """
+    if stats is not None:
+        stats.switchPhase('setup')
+        heuristic = stats.countedHeuristic(heuristic)
+    inPlace = 'doAction' in dir(problem)
+    if inPlace:
+        state = problem.getMutableStartState()
+        expand = problem.getActions
+    else:
+        state = problem.getStartState()
+        expand = problem.getSuccessors
+    if stats is not None: expand = stats.countedExpansion(expand)
+    if budget is not None: budget.start()
     path = []
-    visited = []
-    myPriorityQueue = util.PriorityQueue()
-    myPriorityQueue.push((problem.getStartState(), [], 0), 0)
+    onPath = set([state])
+
+    def boundedSearch(state, pathCost, bound, lastAction):
+        # Returns None once a goal is found (leaving its actions in path),
+        # otherwise the smallest estimate that exceeded the bound.
+        estimate = pathCost + heuristic(state, problem)
+        if estimate > bound:
+            return estimate
+        if problem.isGoalState(state):
+            return None
+        if stats is not None: stats.observe(len(path) + 1, 0)
+        if budget is not None and budget.spend():
+            budget.exceeded(list(path), stats)
+
+        minimum = float('inf')
+        if inPlace:
+            reverse = lastAction is not None and problem.reverseAction(lastAction)
+            for action in expand(state):
+                if action == reverse:
+                    continue
+                cost = problem.doAction(state, action)
+                path.append(action)
+                result = boundedSearch(state, pathCost + cost, bound, action)
+                problem.undoAction(state, action)
+                if result is None:
+                    return None
+                path.pop()
+                minimum = min(minimum, result)
+        else:
+            for nextState, action, cost in expand(state):
+                if nextState in onPath:
+                    continue
+                onPath.add(nextState)
+                path.append(action)
+                result = boundedSearch(nextState, pathCost + cost, bound, action)
+                onPath.remove(nextState)
+                if result is None:
+                    return None
+                path.pop()
+                minimum = min(minimum, result)
+        return minimum
+
+    if stats is not None: stats.switchPhase('search')
+    bound = heuristic(state, problem)
+    while bound != float('inf'):
+        bound = boundedSearch(state, 0, bound, None)
+        if bound is None:
+            if stats is not None: stats.finish()
+            return path
+
+    if stats is not None: stats.finish()
+    util.raiseNotDefined()
+
+def anytimeWeightedAStarSearch(problem, heuristic=nullHeuristic, weight=2.0, deadline=None,
+                               callback=None, stats=None, budget=None):
+    """
+    Anytime weighted A* (AWA*).  Nodes are searched in order of
+    cost + weight * heuristic, which finds a first solution quickly.  The
+    search then goes on, pruning every node whose cost plus heuristic is no
+    less than the best solution so far and reopening states reached more
+    cheaply, so each solution found is cheaper than the one before.  With an
+    admissible heuristic the last solution is optimal once the open list is
+    empty.
+
+    deadline: seconds after which the best solution so far is returned; the
+              search always goes on until it has a first solution
+    callback: called as callback(path, cost, bound) for every improved
+              solution, where bound is a lower bound on the optimal cost
+              (the smallest cost plus heuristic still open), and once more
+              with bound equal to cost when the solution is proven optimal
+
+    Running out of the deadline or the budget returns the best solution so
+    far; if there is none yet the budget raises as usual.
+    """
+    getSuccessors = problem.getSuccessors
+    if stats is not None:
+        stats.switchPhase('setup')
+        getSuccessors = stats.countedExpansion(getSuccessors)
+        heuristic = stats.countedHeuristic(heuristic)
+    if budget is not None: budget.start()
+    startTime = time.time()
+    start = problem.getStartState()
+    costs, parents = {start: 0}, {start: None}
+    estimates = {start: heuristic(start, problem)}
+    # Heap entries are (cost + weight * heuristic, count, cost, state)
+    heap = [(weight * estimates[start], 0, 0, start)]
+    count = 1
+    bestCost, bestPath, bound = float('inf'), None, 0
+    exhausted, popped = True, 0
+
+    def lowerBound():
+        # The smallest cost plus heuristic of the nodes still open
+        minimum = bestCost
+        for priority, c, cost, state in heap:
+            if cost == costs[state] and cost + estimates[state] < minimum:
+                minimum = cost + estimates[state]
+        return minimum
+
+    if stats is not None: stats.switchPhase('search')
+    while heap:
+        if stats is not None: stats.observe(len(heap), len(costs))
+        popped += 1
+        if deadline is not None and bestPath is not None and popped % 64 == 0 and \
+           time.time() - startTime > deadline:
+            exhausted = False
+            break
+        priority, c, cost, state = heapq.heappop(heap)
+        if cost > costs[state] or cost + estimates[state] >= bestCost:
+            continue  # a cheaper path to this state was found, or pruned
+
+        if problem.isGoalState(state):
+            bestCost, bestPath = cost, forwardPath(state, parents)
+            if callback is not None:
+                bound = lowerBound()
+                callback(bestPath, bestCost, bound)
+            continue
+        if budget is not None and budget.spend():
+            if bestPath is None:
+                budget.exceeded(forwardPath(state, parents), stats)
+            exhausted = False
+            break
+
+        for nextState, action, stepCost in getSuccessors(state):
+            nextCost = cost + stepCost
+            if nextState in costs and costs[nextState] <= nextCost:
+                continue
+            if nextState not in estimates:
+                estimates[nextState] = heuristic(nextState, problem)
+            if nextCost + estimates[nextState] >= bestCost:
+                continue
+            if stats is not None and nextState in costs: stats.duplicates += 1
+            costs[nextState] = nextCost
+            parents[nextState] = (state, action)
+            heapq.heappush(heap, (nextCost + weight * estimates[nextState], count, nextCost, nextState))
+            count += 1
+
+    if stats is not None: stats.finish()
+    if bestPath is None:
+        util.raiseNotDefined()
+    if exhausted and callback is not None and bound < bestCost:
+        callback(bestPath, bestCost, bestCost)
+    return bestPath
+
+class SearchEvent:
+    """
+    One step of a search run through one of the ...Steps generators below.
 
-    while not myPriorityQueue.isEmpty():
-        current, path, currentCost = myPriorityQueue.pop()
+      state         the state being expanded, or the goal state
+      cost          the cost of the path to state
+      estimate      the heuristic value of state (0 without a heuristic)
+      frontierSize  the number of nodes waiting in the frontier
+      path          None while searching; the actions reaching the goal in
+                    the last event of a successful search
+    """
+
+    def __init__(self, state, cost, estimate, frontierSize, path=None):
+        self.state = state
+        self.cost = cost
+        self.estimate = estimate
+        self.frontierSize = frontierSize
+        self.path = path
+
+    def __str__(self):
+        return 'SearchEvent(state=%s, cost=%s, estimate=%s, frontierSize=%d, path=%s)' % \
+               (self.state, self.cost, self.estimate, self.frontierSize, self.path)
+
+# The ...Steps generators search like the functions of the same name but
+# yield a SearchEvent for every state they expand, followed by one whose
+# path is set when a goal is found (anytimeWeightedAStarSearchSteps yields
+# one for every improved solution, the last being the best).  The search
+# only advances while the caller asks for events, so it can be paused by
+# not asking and cancelled with close().  A generator that ends without
+# such an event found no path.
+
+def graphSearchSteps(problem, frontier, heuristic=None):
+    "graphSearch as a generator; heuristic only fills in the event estimates."
+    visited = set()
+    frontier.push((problem.getStartState(), None, None, 0))
+
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        current, currentCost = node[0], node[3]
         if current not in visited:
-            visited.append(current)
+            visited.add(current)
+            estimate = heuristic is not None and heuristic(current, problem) or 0
 
             if problem.isGoalState(current):
-                return path
+                yield SearchEvent(current, currentCost, estimate, len(frontier), reconstructPath(node))
+                return
+            yield SearchEvent(current, currentCost, estimate, len(frontier))
 
-            successors = problem.getSuccessors(current)
-            for nextLocation, nextDirection, cost in successors:
+            for nextLocation, nextDirection, cost in problem.getSuccessors(current):
                 if nextLocation not in visited:
-                    newCost = currentCost + cost
-                    heuristicCost = newCost + heuristic(nextLocation, problem)
-                    myPriorityQueue.push((nextLocation, path + [nextDirection], newCost), heuristicCost)
+                    frontier.push((nextLocation, nextDirection, node, currentCost + cost))
+
+def bestFirstSearchSteps(problem, priorityFunction, heuristic=None):
+    "bestFirstSearch as a generator; heuristic only fills in the event estimates."
+    start = problem.getStartState()
+    nodes = {start: (start, None, None, 0)}
+    visited = set()
+    frontier = util.IndexedPriorityQueue()
+    frontier.push(start, priorityFunction(start, 0))
+
+    while not frontier.isEmpty():
+        current = frontier.pop()
+        node = nodes[current]
+        visited.add(current)
+        estimate = heuristic is not None and heuristic(current, problem) or 0
+
+        if problem.isGoalState(current):
+            yield SearchEvent(current, node[3], estimate, len(frontier), reconstructPath(node))
+            return
+        yield SearchEvent(current, node[3], estimate, len(frontier))
+
+        for nextLocation, nextDirection, cost in problem.getSuccessors(current):
+            if nextLocation not in visited:
+                newCost = node[3] + cost
+                if nextLocation in frontier and nodes[nextLocation][3] <= newCost:
+                    continue
+                nodes[nextLocation] = (nextLocation, nextDirection, node, newCost)
+                frontier.update(nextLocation, priorityFunction(nextLocation, newCost))
+
+def depthFirstSearchSteps(problem):
+    return graphSearchSteps(problem, util.Stack())
+
+def breadthFirstSearchSteps(problem):
+    return graphSearchSteps(problem, util.Queue())
+
+def uniformCostSearchSteps(problem):
+    return bestFirstSearchSteps(problem, lambda state, cost: cost)
+
+def aStarSearchSteps(problem, heuristic=nullHeuristic):
+    return bestFirstSearchSteps(problem, lambda state, cost: cost + heuristic(state, problem), heuristic)
+
+def bucketUniformCostSearchSteps(problem):
+    return graphSearchSteps(problem, util.BucketPriorityQueueWithFunction(lambda node: node[3]))
+
+def bucketAStarSearchSteps(problem, heuristic=nullHeuristic):
+    def priorityFunction(node):
+        h = heuristic(node[0], problem)
+        return node[3] + h, h
+    return graphSearchSteps(problem, util.BucketPriorityQueueWithFunction(priorityFunction), heuristic)
+
+def iterativeDeepeningAStarSearchSteps(problem, heuristic=nullHeuristic):
+    """
+    iterativeDeepeningAStarSearch as a generator, with an explicit stack in
+    place of the recursion.  It always uses getSuccessors; the frontier
+    size of the events is the length of the current path.
+    """
+    start = problem.getStartState()
+    bound = heuristic(start, problem)
+    while bound != float('inf'):
+        minimum = float('inf')
+        path, onPath = [], set([start])
+        stack = []    # (state, cost, successors left to try) along the path
+        node = (start, 0)
+        while node is not None:
+            state, cost = node
+            estimate = heuristic(state, problem)
+            if cost + estimate > bound:
+                minimum = min(minimum, cost + estimate)
+                onPath.remove(state)
+                path.pop()
+            elif problem.isGoalState(state):
+                yield SearchEvent(state, cost, estimate, len(stack), list(path))
+                return
+            else:
+                yield SearchEvent(state, cost, estimate, len(stack))
+                stack.append((state, cost, iter(problem.getSuccessors(state))))
+
+            # Move on to the next successor not on the path, backtracking
+            # out of the states that have none left
+            node = None
+            while stack and node is None:
+                state, cost, successors = stack[-1]
+                for nextState, action, stepCost in successors:
+                    if nextState not in onPath:
+                        onPath.add(nextState)
+                        path.append(action)
+                        node = (nextState, cost + stepCost)
+                        break
+                else:
+                    stack.pop()
+                    if stack:
+                        onPath.remove(state)
+                        path.pop()
+        bound = minimum
 
+def anytimeWeightedAStarSearchSteps(problem, heuristic=nullHeuristic, weight=2.0, deadline=None):
+    """
+    anytimeWeightedAStarSearch as a generator.  Every improved solution is
+    an event with its path; the generator ends when the last one is proven
+    optimal, or at the first expansion after deadline seconds once there is
+    a solution.
+    """
+    startTime = time.time()
+    start = problem.getStartState()
+    costs, parents = {start: 0}, {start: None}
+    estimates = {start: heuristic(start, problem)}
+    heap = [(weight * estimates[start], 0, 0, start)]
+    count = 1
+    bestCost = float('inf')
+
+    while heap:
+        if deadline is not None and bestCost != float('inf') and time.time() - startTime > deadline:
+            return
+        priority, c, cost, state = heapq.heappop(heap)
+        if cost > costs[state] or cost + estimates[state] >= bestCost:
+            continue
+
+        if problem.isGoalState(state):
+            bestCost = cost
+            yield SearchEvent(state, cost, estimates[state], len(heap), forwardPath(state, parents))
+            continue
+        yield SearchEvent(state, cost, estimates[state], len(heap))
+
+        for nextState, action, stepCost in problem.getSuccessors(state):
+            nextCost = cost + stepCost
+            if nextState in costs and costs[nextState] <= nextCost:
+                continue
+            if nextState not in estimates:
+                estimates[nextState] = heuristic(nextState, problem)
+            if nextCost + estimates[nextState] >= bestCost:
+                continue
+            costs[nextState] = nextCost
+            parents[nextState] = (state, action)
+            heapq.heappush(heap, (nextCost + weight * estimates[nextState], count, nextCost, nextState))
+            count += 1
+
+def compactAStarSearchSteps(problem, heuristic=nullHeuristic):
+    "compactAStarSearch as a generator; event states are decoded."
+    encode, decode = problem.encodeState, problem.decodeState
+    table = CompactSearchTable()
+    costs, closed = table.costs, table.closed
+    start = problem.getStartState()
+    startCode = encode(start)
+    table.add(startCode)
+    estimate = heuristic(start, problem)
+    frontier = util.BucketPriorityQueue()
+    frontier.push(startCode, estimate, estimate)
+
+    while not frontier.isEmpty():
+        code = frontier.pop()
+        slot = table.slot(code)
+        if closed[slot]:
+            continue
+        closed[slot] = 1
+        state, cost = decode(code), costs[slot]
+
+        if problem.isGoalState(state):
+            yield SearchEvent(state, cost, heuristic(state, problem), len(frontier), table.path(code))
+            return
+        yield SearchEvent(state, cost, heuristic(state, problem), len(frontier))
+
+        for nextState, action, stepCost in problem.getSuccessors(state):
+            nextCode, nextCost = encode(nextState), cost + stepCost
+            nextSlot = table.slot(nextCode)
+            if nextSlot >= 0:
+                if closed[nextSlot] or costs[nextSlot] <= nextCost:
+                    continue
+            else:
+                nextSlot = table.add(nextCode)
+            costs[nextSlot] = nextCost
+            table.setParent(nextSlot, code, action)
+            estimate = heuristic(nextState, problem)
+            frontier.push(nextCode, nextCost + estimate, estimate)
+
+def forwardPath(state, forwardParents):
+    """
+    Returns the actions from the start to state.  Forward entries are
+    (previous state, action, ...), with None for the start.
+    """
+    path = []
+    entry = forwardParents[state]
+    while entry is not None:
+        path.append(entry[1])
+        entry = forwardParents[entry[0]]
+    path.reverse()
+    return path
+
+def joinPaths(meeting, forwardParents, backwardParents):
+    """
+    Builds the path of a bidirectional search through the meeting state.
+    Forward entries are (previous state, action, ...) and backward entries
+    are (next state, action, ...), with None for the start and goal.
+    """
+    path = forwardPath(meeting, forwardParents)
+    entry = backwardParents[meeting]
+    while entry is not None:
+        path.append(entry[1])
+        entry = backwardParents[entry[0]]
+    return path
+
+def bidirectionalBreadthFirstSearch(problem, stats=None, budget=None):
+    """
+    Search breadth first from the start and backwards from the goal at the
+    same time, always growing the smaller frontier by a whole layer, until
+    the two searches meet.
+
+    The problem must define getGoalState and getPredecessors, which returns
+    (predecessor, action, stepCost) triples where action leads from the
+    predecessor to the given state.  If the budget runs out, the partial
+    path leads to the deepest state reached from the start.
+    """
+    getSuccessors, getPredecessors = problem.getSuccessors, problem.getPredecessors
+    if stats is not None:
+        stats.switchPhase('setup')
+        getSuccessors = stats.countedExpansion(getSuccessors)
+        getPredecessors = stats.countedExpansion(getPredecessors)
+    if budget is not None: budget.start()
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        if stats is not None: stats.finish()
+        return []
+    # Parent entries are (state, action, depth); the roots have None
+    forwardParents, backwardParents = {start: None}, {goal: None}
+    forwardLayer, backwardLayer = [start], [goal]
+    if stats is not None: stats.switchPhase('search')
+
+    def depth(parents, state):
+        return parents[state] and parents[state][2] or 0
+
+    while forwardLayer and backwardLayer:
+        if stats is not None:
+            stats.observe(len(forwardLayer) + len(backwardLayer), len(forwardParents) + len(backwardParents))
+        if len(forwardLayer) <= len(backwardLayer):
+            layer, expand = forwardLayer, getSuccessors
+            parents, otherParents = forwardParents, backwardParents
+        else:
+            layer, expand = backwardLayer, getPredecessors
+            parents, otherParents = backwardParents, forwardParents
+
+        # Finish the whole layer so the shortest of its meetings is used
+        nextLayer, meeting, shortest = [], None, None
+        for state in layer:
+            if budget is not None and budget.spend():
+                budget.exceeded(forwardPath(forwardLayer[0], forwardParents), stats)
+            nextDepth = depth(parents, state) + 1
+            for nextState, action, cost in expand(state):
+                if nextState not in parents:
+                    parents[nextState] = (state, action, nextDepth)
+                    nextLayer.append(nextState)
+                    if nextState in otherParents:
+                        length = nextDepth + depth(otherParents, nextState)
+                        if shortest is None or length < shortest:
+                            meeting, shortest = nextState, length
+        if meeting is not None:
+            if stats is None:
+                return joinPaths(meeting, forwardParents, backwardParents)
+            stats.switchPhase('path')
+            path = joinPaths(meeting, forwardParents, backwardParents)
+            stats.finish()
+            return path
+
+        if layer is forwardLayer:
+            forwardLayer = nextLayer
+        else:
+            backwardLayer = nextLayer
+
+    if stats is not None: stats.finish()
     util.raiseNotDefined()
 
+def bidirectionalAStarSearch(problem, heuristic=nullHeuristic, backwardHeuristic=nullHeuristic, stats=None, budget=None):
+    """
+    Meet in the middle bidirectional A* (MM).  Both directions order their
+    nodes by max(cost + heuristic, 2 * cost) and the search stops once the
+    cheapest path found costs no more than the smallest priority left on
+    either side.
+
+    heuristic estimates the cost to the goal as usual; backwardHeuristic
+    estimates the cost from the start (e.g. searchAgents.startManhattanHeuristic)
+    and defaults to 0, which leaves the backward search blind.  The
+    problem must define getGoalState and getPredecessors (see
+    bidirectionalBreadthFirstSearch).  A better path to a state that was
+    already reached counts as a duplicate push in stats.  If the budget
+    runs out, the partial path leads to the state of the forward frontier
+    with the lowest priority.
+    """
+    expand = (problem.getSuccessors, problem.getPredecessors)
+    heuristics = (heuristic, backwardHeuristic)
+    if stats is not None:
+        stats.switchPhase('setup')
+        expand = tuple([stats.countedExpansion(function) for function in expand])
+        heuristics = tuple([stats.countedHeuristic(function) for function in heuristics])
+    if budget is not None: budget.start()
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        if stats is not None: stats.finish()
+        return []
+    costs = ({start: 0}, {goal: 0})
+    parents = ({start: None}, {goal: None})
+    # Heap entries are (priority, cost, count, state)
+    heaps = ([(0, 0, 0, start)], [(0, 0, 1, goal)])
+    count = 2
+    bestCost, meeting = float('inf'), None
+
+    if stats is not None: stats.switchPhase('search')
+    while True:
+        if stats is not None:
+            stats.observe(len(heaps[0]) + len(heaps[1]), len(costs[0]) + len(costs[1]))
+        for side in (0, 1):
+            heap = heaps[side]
+            while heap and heap[0][1] > costs[side][heap[0][3]]:
+                heapq.heappop(heap)  # a cheaper path to this state was found
+        if not heaps[0] or not heaps[1]:
+            break
+        side = heaps[0][0][0] > heaps[1][0][0] and 1 or 0
+        if bestCost <= heaps[side][0][0]:
+            break
+
+        if budget is not None and budget.spend():
+            budget.exceeded(forwardPath(heaps[0][0][3], parents[0]), stats)
+        priority, cost, c, state = heapq.heappop(heaps[side])
+        otherCosts = costs[1 - side]
+        for nextState, action, stepCost in expand[side](state):
+            nextCost = cost + stepCost
+            if nextState in costs[side]:
+                if costs[side][nextState] <= nextCost:
+                    continue
+                if stats is not None: stats.duplicates += 1
+            costs[side][nextState] = nextCost
+            parents[side][nextState] = (state, action)
+            estimate = nextCost + heuristics[side](nextState, problem)
+            heapq.heappush(heaps[side], (max(estimate, 2 * nextCost), nextCost, count, nextState))
+            count += 1
+            if nextState in otherCosts and nextCost + otherCosts[nextState] < bestCost:
+                bestCost, meeting = nextCost + otherCosts[nextState], nextState
+
+    if meeting is None:
+        if stats is not None: stats.finish()
+        util.raiseNotDefined()
+    if stats is None:
+        return joinPaths(meeting, parents[0], parents[1])
+    stats.switchPhase('path')
+    path = joinPaths(meeting, parents[0], parents[1])
+    stats.finish()
+    return path
+
+def bidirectionalBreadthFirstSearchSteps(problem):
+    """
+    bidirectionalBreadthFirstSearch as a generator.  Events come from both
+    sides; their cost is the depth from the side's own root and the frontier
+    counts the states of both layers still to expand.
+    """
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        yield SearchEvent(start, 0, 0, 0, [])
+        return
+    forwardParents, backwardParents = {start: None}, {goal: None}
+    forwardLayer, backwardLayer = [start], [goal]
+
+    def depth(parents, state):
+        return parents[state] and parents[state][2] or 0
+
+    while forwardLayer and backwardLayer:
+        if len(forwardLayer) <= len(backwardLayer):
+            layer, otherLayer, expand = forwardLayer, backwardLayer, problem.getSuccessors
+            parents, otherParents = forwardParents, backwardParents
+        else:
+            layer, otherLayer, expand = backwardLayer, forwardLayer, problem.getPredecessors
+            parents, otherParents = backwardParents, forwardParents
+
+        nextLayer, meeting, shortest = [], None, None
+        for i, state in enumerate(layer):
+            nextDepth = depth(parents, state) + 1
+            yield SearchEvent(state, nextDepth - 1, 0, len(layer) - i - 1 + len(otherLayer))
+            for nextState, action, cost in expand(state):
+                if nextState not in parents:
+                    parents[nextState] = (state, action, nextDepth)
+                    nextLayer.append(nextState)
+                    if nextState in otherParents:
+                        length = nextDepth + depth(otherParents, nextState)
+                        if shortest is None or length < shortest:
+                            meeting, shortest = nextState, length
+        if meeting is not None:
+            yield SearchEvent(meeting, shortest, 0, len(nextLayer) + len(otherLayer),
+                              joinPaths(meeting, forwardParents, backwardParents))
+            return
+
+        if layer is forwardLayer:
+            forwardLayer = nextLayer
+        else:
+            backwardLayer = nextLayer
+
+def bidirectionalAStarSearchSteps(problem, heuristic=nullHeuristic, backwardHeuristic=nullHeuristic):
+    """
+    bidirectionalAStarSearch as a generator.  Events come from both sides;
+    the estimate of a backward event is its backwardHeuristic value and the
+    frontier counts the open nodes of both sides.  The path event is for
+    the state where the best path found meets.
+    """
+    heuristics = (heuristic, backwardHeuristic)
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal:
+        yield SearchEvent(start, 0, 0, 0, [])
+        return
+    expand = (problem.getSuccessors, problem.getPredecessors)
+    costs = ({start: 0}, {goal: 0})
+    parents = ({start: None}, {goal: None})
+    # Heap entries are (priority, cost, count, state, heuristic value)
+    heaps = ([(0, 0, 0, start, heuristic(start, problem))], [(0, 0, 1, goal, backwardHeuristic(goal, problem))])
+    count = 2
+    bestCost, meeting = float('inf'), None
+
+    while True:
+        for side in (0, 1):
+            heap = heaps[side]
+            while heap and heap[0][1] > costs[side][heap[0][3]]:
+                heapq.heappop(heap)
+        if not heaps[0] or not heaps[1]:
+            break
+        side = heaps[0][0][0] > heaps[1][0][0] and 1 or 0
+        if bestCost <= heaps[side][0][0]:
+            break
+
+        priority, cost, c, state, estimate = heapq.heappop(heaps[side])
+        yield SearchEvent(state, cost, estimate, len(heaps[0]) + len(heaps[1]))
+        otherCosts = costs[1 - side]
+        for nextState, action, stepCost in expand[side](state):
+            nextCost = cost + stepCost
+            if nextState in costs[side] and costs[side][nextState] <= nextCost:
+                continue
+            costs[side][nextState] = nextCost
+            parents[side][nextState] = (state, action)
+            nextEstimate = heuristics[side](nextState, problem)
+            heapq.heappush(heaps[side], (max(nextCost + nextEstimate, 2 * nextCost), nextCost, count,
+                                         nextState, nextEstimate))
+            count += 1
+            if nextState in otherCosts and nextCost + otherCosts[nextState] < bestCost:
+                bestCost, meeting = nextCost + otherCosts[nextState], nextState
+
+    if meeting is not None:
+        yield SearchEvent(meeting, bestCost, heuristic(meeting, problem), len(heaps[0]) + len(heaps[1]),
+                          joinPaths(meeting, parents[0], parents[1]))
+
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+idastar = iterativeDeepeningAStarSearch
+bibfs = bidirectionalBreadthFirstSearch
+biastar = bidirectionalAStarSearch
+bucs = bucketUniformCostSearch
+bastar = bucketAStarSearch
+awastar = anytimeWeightedAStarSearch
+castar = compactAStarSearch
@@ -37,9 +37,11 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitmaskGrid
 import util
 import time
 import search
+import mazeDistances
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -69,11 +71,16 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    With stats=True, search functions that take a stats argument report a
+    search.SearchStatistics after the search.  With watch=N, the ...Steps
+    form of the search function is run instead and the cells expanded so
+    far are drawn after every N expansions (see watchSearch).
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats='False',
+                 watch='0'):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -94,6 +101,30 @@ class SearchAgent(Agent):
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
             self.searchFunction = lambda x: func(x, heuristic=heur)
 
+        # Collect search statistics when asked to and supported by the function
+        self.stats = None
+        self.collectStats = stats == True or str(stats).lower() == 'true'
+        if self.collectStats:
+            if 'stats' not in func.func_code.co_varnames:
+                raise AttributeError, fn + ' does not collect search statistics.'
+            if 'heuristic' not in func.func_code.co_varnames:
+                self.searchFunction = lambda x: func(x, stats=self.stats)
+            else:
+                self.searchFunction = lambda x: func(x, heuristic=heur, stats=self.stats)
+
+        # Run the search step by step, drawing its progress, when asked to
+        self.watch = int(watch)
+        if self.watch > 0:
+            if self.collectStats:
+                raise AttributeError, 'stats and watch cannot be used together.'
+            if func.__name__ + 'Steps' not in dir(search):
+                raise AttributeError, fn + ' cannot be run step by step.'
+            steps = getattr(search, func.__name__ + 'Steps')
+            if 'heuristic' not in steps.func_code.co_varnames:
+                self.searchFunction = lambda x: watchSearch(steps(x), x, self.watch)
+            else:
+                self.searchFunction = lambda x: watchSearch(steps(x, heuristic=heur), x, self.watch)
+
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
             raise AttributeError, prob + ' is not a search problem type in SearchAgents.py.'
@@ -112,10 +143,12 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception, "No search function provided for SearchAgent"
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
+        if 'collectStats' in dir(self) and self.collectStats: self.stats = search.SearchStatistics()
         self.actions  = self.searchFunction(problem) # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'collectStats' in dir(self) and self.collectStats: print(self.stats)
 
     def getAction(self, state):
         """
@@ -133,6 +166,60 @@ class SearchAgent(Agent):
         else:
             return Directions.STOP
 
+SUCCESSOR_TABLE_CACHE = {}   # id of a walls Grid -> (walls, successors, predecessors)
+
+def getSuccessorTables(walls):
+    """
+    Returns two dictionaries for the open cells of a walls Grid: successors
+    maps a cell to the (neighbor, action) pairs of the moves out of it and
+    predecessors to the (neighbor, action) pairs of the moves into it, both
+    in the order north, south, east, west.  The tables are compiled once per
+    walls Grid and shared by every problem built on the same layout.
+    """
+    entry = SUCCESSOR_TABLE_CACHE.get(id(walls))
+    if entry is not None and entry[0] is walls:
+        return entry[1], entry[2]
+
+    actions = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+    vectors = [Actions.directionToVector(action) for action in actions]
+    successors, predecessors = {}, {}
+    for x, y in walls.asList(False):
+        moves, reverseMoves = [], []
+        for action, (dx, dy) in zip(actions, vectors):
+            nextx, nexty = int(x + dx), int(y + dy)
+            if not walls[nextx][nexty]:
+                moves.append(((nextx, nexty), action))
+            prevx, prevy = int(x - dx), int(y - dy)
+            if not walls[prevx][prevy]:
+                reverseMoves.append(((prevx, prevy), action))
+        successors[(x, y)] = moves
+        predecessors[(x, y)] = reverseMoves
+    SUCCESSOR_TABLE_CACHE[id(walls)] = (walls, successors, predecessors)
+    return successors, predecessors
+
+def watchSearch(steps, problem, watch):
+    """
+    Runs a search.SearchEvent generator and returns the last path it finds.
+    Every watch-th expansion, the cells the problem has expanded so far
+    (its _visitedlist) are drawn on the display, if both support it.
+    """
+    import __main__
+    display = None
+    if '_display' in dir(__main__) and 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
+        if '_visitedlist' in dir(problem): display = __main__._display #@UndefinedVariable
+    path, expanded = None, 0
+    for event in steps:
+        if event.path is not None:
+            path = event.path   # anytime searches may improve on it
+            continue
+        expanded += 1
+        if display is not None and expanded % watch == 0:
+            display.drawExpandedCells(problem._visitedlist)
+            import graphicsUtils
+            graphicsUtils.refresh()
+    if path is None: util.raiseNotDefined()
+    return path
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -153,6 +240,7 @@ class PositionSearchProblem(search.SearchProblem):
         goal: A position in the gameState
         """
         self.walls = gameState.getWalls()
+        self.successorTable, self.predecessorTable = getSuccessorTables(self.walls)
         self.startState = gameState.getPacmanPosition()
         if start != None: self.startState = start
         self.goal = goal
@@ -192,15 +280,8 @@ class PositionSearchProblem(search.SearchProblem):
          cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextState = (nextx, nexty)
-                cost = self.costFn(nextState)
-                successors.append( ( nextState, action, cost) )
+        costFn = self.costFn
+        successors = [(nextState, action, costFn(nextState)) for nextState, action in self.successorTable[state]]
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
@@ -210,6 +291,27 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the positions pacman can reach this state from, the actions
+        leading from them to the state, and the cost of that step.  Used by
+        the bidirectional searches in search.py.
+        """
+
+        cost = self.costFn(state)
+        predecessors = [(prevState, action, cost) for prevState, action in self.predecessorTable[state]]
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions. If those actions
@@ -256,6 +358,15 @@ def manhattanHeuristic(position, problem, info={}):
     xy2 = problem.goal
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
 
+def startManhattanHeuristic(position, problem, info={}):
+    """
+    The Manhattan distance from the start of a PositionSearchProblem; the
+    backward heuristic of bidirectional A*
+    """
+    xy1 = position
+    xy2 = problem.startState
+    return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
+
 def euclideanHeuristic(position, problem, info={}):
     "The Euclidean distance heuristic for a PositionSearchProblem"
     xy1 = position
@@ -278,6 +389,7 @@ class CornersProblem(search.SearchProblem):
         Stores the walls, pacman's starting position and corners.
         """
         self.walls = startingGameState.getWalls()
+        self.successorTable = getSuccessorTables(self.walls)[0]
         self.startingPosition = startingGameState.getPacmanPosition()
         top, right = self.walls.height-2, self.walls.width-2
         self.corners = ((1,1), (1,top), (right, 1), (right, top))
@@ -339,34 +451,25 @@ class CornersProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            hitsWall = self.walls[nextx][nexty]
-
-            if not hitsWall:
+        # The successor table only holds the legal moves
+        for nextState, action in self.successorTable[state[0]]:
+            # Have to create a new list to create a deep copy
+            # else it won't return correct number of moves
+            cornersVisited = list(state[1])
+            if nextState == self.corners[0]:
+                cornersVisited[0] = True
 
-                nextState = (nextx, nexty)
+            if nextState == self.corners[1]:
+                cornersVisited[1] = True
 
-                # Have to create a new list to create a deep copy
-                # else it won't return correct number of moves
-                cornersVisited = list(state[1])
-                if nextState == self.corners[0]:
-                    cornersVisited[0] = True
+            if nextState == self.corners[2]:
+                cornersVisited[2] = True
 
-                if nextState == self.corners[1]:
-                    cornersVisited[1] = True
+            if nextState == self.corners[3]:
+                cornersVisited[3] = True
 
-                if nextState == self.corners[2]:
-                    cornersVisited[2] = True
-
-                if nextState == self.corners[3]:
-                    cornersVisited[3] = True
-
-                cost = 1
-                successors.append(((nextState, tuple(cornersVisited)), action, cost,))
+            cost = 1
+            successors.append(((nextState, tuple(cornersVisited)), action, cost,))
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -489,11 +592,17 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a BitmaskGrid (see game.py) of either True or False, specifying remaining food
+
+    foodGrid reads like a Grid (foodGrid[x][y], count(), asList()) but keeps
+    the food as the bits of one int, so successors share nothing but an int
+    and states hash quickly.
     """
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
         self.walls = startingGameState.getWalls()
+        self.successorTable = getSuccessorTables(self.walls)[0]
+        food = BitmaskGrid.fromGrid(startingGameState.getFood(), self.walls)
+        self.start = (startingGameState.getPacmanPosition(), food)
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
         self.heuristicInfo = {} # A dictionary for the heuristic to store information
@@ -502,20 +611,16 @@ class FoodSearchProblem:
         return self.start
 
     def isGoalState(self, state):
-        return state[1].count() == 0
+        return state[1].bits == 0
 
     def getSuccessors(self, state):
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
-        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(direction)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
-                successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        food = state[1]
+        for (nextx, nexty), direction in self.successorTable[state[0]]:
+            nextFood = food.without(nextx, nexty)
+            successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
     def getCostOfActions(self, actions):
@@ -623,6 +728,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
+        self.successorTable, self.predecessorTable = getSuccessorTables(self.walls)
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
@@ -652,5 +758,5 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    # All distances of the layout are computed once (see mazeDistances.py)
+    return mazeDistances.getMazeDistances(walls).distance(point1, point2)
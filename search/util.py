@@ -29,6 +29,8 @@
 import sys
 import inspect
 import heapq, random
+import collections
+import array
 import cStringIO
 
 
@@ -148,26 +150,36 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
 
     def push(self,item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0,item)
+        self.list.append(item)
+
+    def extend(self,items):
+        "Enqueue all of the 'items', in order"
+        self.list.extend(items)
 
     def pop(self):
         """
           Dequeue the earliest enqueued item still in the queue. This
           operation removes the item from the queue.
         """
-        return self.list.pop()
+        return self.list.popleft()
 
     def isEmpty(self):
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -191,6 +203,9 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
     def update(self, item, priority):
         # If item already in priority queue with higher priority, update its priority and rebuild the heap.
         # If item already in priority queue with equal or lower priority, do nothing.
@@ -222,6 +237,267 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class IndexedPriorityQueue:
+    """
+      A binary heap priority queue that holds each item at most once and
+      remembers where every item sits in the heap, so that looking an item
+      up, pushing, popping and lowering the priority of a queued item all
+      take O(log n) time or better.  Items must be hashable.
+
+      Ties are broken in the order the items were first pushed.  Pushing an
+      item that is already queued behaves like update.
+    """
+    def  __init__(self):
+        self.heap = []    # [priority, count, item] entries; counts are unique,
+                          # so comparing entries never compares items
+        self.index = {}   # item -> position of its entry in the heap
+        self.count = 0
+
+    def push(self, item, priority):
+        if item in self.index:
+            self.update(item, priority)
+            return
+        self.heap.append([priority, self.count, item])
+        self.index[item] = len(self.heap) - 1
+        self.count += 1
+        self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        heap = self.heap
+        last = heap.pop()
+        if heap:
+            entry = heap[0]
+            heap[0] = last
+            self.index[last[2]] = 0
+            self._siftDown(0)
+        else:
+            entry = last
+        del self.index[entry[2]]
+        return entry[2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # If item already in priority queue with higher priority, lower it in place.
+        # If item already in priority queue with equal or lower priority, do nothing.
+        # If item not in priority queue, do the same thing as self.push.
+        if item not in self.index:
+            self.push(item, priority)
+            return
+        position = self.index[item]
+        if self.heap[position][0] <= priority:
+            return
+        self.heap[position][0] = priority
+        self._siftUp(position)
+
+    def getPriority(self, item):
+        return self.heap[self.index[item]][0]
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, position):
+        heap, index = self.heap, self.index
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if heap[parent] <= entry:
+                break
+            heap[position] = heap[parent]
+            index[heap[position][2]] = position
+            position = parent
+        heap[position] = entry
+        index[entry[2]] = position
+
+    def _siftDown(self, position):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[position]
+        child = 2 * position + 1
+        while child < size:
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if entry <= heap[child]:
+                break
+            heap[position] = heap[child]
+            index[heap[position][2]] = position
+            position = child
+            child = 2 * position + 1
+        heap[position] = entry
+        index[entry[2]] = position
+
+class IndexedPriorityQueueWithFunction(IndexedPriorityQueue):
+    """
+    An IndexedPriorityQueue with the push(item) signature of
+    PriorityQueueWithFunction.
+    """
+    def  __init__(self, priorityFunction):
+        "priorityFunction (item) -> priority"
+        self.priorityFunction = priorityFunction      # store the priority function
+        IndexedPriorityQueue.__init__(self)        # super-class initializer
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        IndexedPriorityQueue.push(self, item, self.priorityFunction(item))
+
+
+class BucketPriorityQueue:
+    """
+      A priority queue for small non-negative integer priorities, such as the
+      f values of unit cost searches with integer heuristics.  Items are kept
+      in one bucket per priority, so push is O(1) and pop only moves past the
+      empty buckets below the lowest priority.
+
+      Each bucket is split again by a small non-negative integer tieBreak,
+      lowest first, and items of equal priority and tieBreak are popped last
+      in, first out.  A* passes h as tieBreak to prefer the deepest nodes of
+      an f layer.
+    """
+    def  __init__(self):
+        self.buckets = []    # buckets[priority][tieBreak] is a stack of items
+        self.minimum = 0     # no bucket below minimum holds any item
+        self.size = 0
+
+    def push(self, item, priority, tieBreak=0):
+        buckets = self.buckets
+        while len(buckets) <= priority:
+            buckets.append([])
+        bucket = buckets[priority]
+        while len(bucket) <= tieBreak:
+            bucket.append([])
+        bucket[tieBreak].append(item)
+        if priority < self.minimum:
+            self.minimum = priority
+        self.size += 1
+
+    def pop(self):
+        if self.size == 0:
+            raise IndexError('pop from an empty BucketPriorityQueue')
+        buckets = self.buckets
+        while not buckets[self.minimum]:
+            self.minimum += 1
+        bucket = buckets[self.minimum]
+        for stack in bucket:
+            if stack:
+                item = stack.pop()
+                break
+        while bucket and not bucket[-1]:
+            bucket.pop()
+        self.size -= 1
+        return item
+
+    def isEmpty(self):
+        return self.size == 0
+
+    def __len__(self):
+        return self.size
+
+class BucketPriorityQueueWithFunction(BucketPriorityQueue):
+    """
+    A BucketPriorityQueue with the push(item) signature of
+    PriorityQueueWithFunction.  The priority function returns either a
+    priority or a (priority, tieBreak) pair.
+    """
+    def  __init__(self, priorityFunction):
+        "priorityFunction (item) -> priority or (priority, tieBreak)"
+        self.priorityFunction = priorityFunction      # store the priority function
+        BucketPriorityQueue.__init__(self)        # super-class initializer
+
+    def push(self, item):
+        "Adds an item to the queue with priority from the priority function"
+        priority = self.priorityFunction(item)
+        if type(priority) == tuple:
+            BucketPriorityQueue.push(self, item, priority[0], priority[1])
+        else:
+            BucketPriorityQueue.push(self, item, priority)
+
+class IntegerHashTable:
+    """
+      An open addressing hash table from integers in [0, 2 ** 64 - 1) to
+      records of unsigned integer fields, stored in flat arrays instead of
+      Python objects: a record costs 8 bytes for the key plus the size of
+      its fields, where a dictionary entry with a tuple value costs well
+      over a hundred bytes.  Keys are kept as two 32 bit halves, since the
+      C long behind array typecode 'L' only has 32 bits on some platforms
+      (Windows among them); use 'I' fields for the same reason.
+
+      fields is a string of array typecodes, one per field, e.g. 'IIB'.
+      Records are addressed by slot: slot(key) finds the slot of a key and
+      add(key) inserts it with all fields 0.  The field values of a slot
+      are read and written through the arrays in self.fields, which keep
+      their identity when the table grows, but slots of existing keys move.
+    """
+    HASH_MULTIPLIER = 0x9E3779B97F4A7C15    # Fibonacci hashing
+    MAX_LOAD = 0.6
+
+    def  __init__(self, fields, capacity=1024):
+        self.bits = max(4, (int(capacity / self.MAX_LOAD) - 1).bit_length())
+        size = 1 << self.bits
+        # The low and high 32 bits of key + 1; both 0 for a free slot
+        self.lowKeys = array.array('I', [0]) * size
+        self.highKeys = array.array('I', [0]) * size
+        self.fields = [array.array(typecode, [0]) * size for typecode in fields]
+        self.count = 0
+
+    def _start(self, key):
+        return ((key * self.HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.bits)
+
+    def slot(self, key):
+        "Returns the slot of key, or -1 if it is not in the table."
+        lowKeys, highKeys = self.lowKeys, self.highKeys
+        low, high = (key + 1) & 0xFFFFFFFF, (key + 1) >> 32
+        mask = len(lowKeys) - 1
+        position = self._start(key)
+        while True:
+            found = lowKeys[position]
+            if found == low and highKeys[position] == high: return position
+            if found == 0 and highKeys[position] == 0: return -1
+            position = (position + 1) & mask
+
+    def add(self, key):
+        "Returns the slot of key, inserting it with zero fields if needed."
+        if self.count + 1 > len(self.lowKeys) * self.MAX_LOAD:
+            self._grow()
+        lowKeys, highKeys = self.lowKeys, self.highKeys
+        low, high = (key + 1) & 0xFFFFFFFF, (key + 1) >> 32
+        mask = len(lowKeys) - 1
+        position = self._start(key)
+        while True:
+            found = lowKeys[position]
+            if found == low and highKeys[position] == high: return position
+            if found == 0 and highKeys[position] == 0:
+                lowKeys[position], highKeys[position] = low, high
+                self.count += 1
+                return position
+            position = (position + 1) & mask
+
+    def __contains__(self, key):
+        return self.slot(key) >= 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        oldLowKeys, oldHighKeys = self.lowKeys[:], self.highKeys[:]
+        oldFields = [field[:] for field in self.fields]
+        self.bits += 1
+        size = 1 << self.bits
+        # Refill the same array objects, so references held by callers stay valid
+        self.lowKeys[:] = array.array('I', [0]) * size
+        self.highKeys[:] = array.array('I', [0]) * size
+        for field in self.fields:
+            field[:] = array.array(field.typecode, [0]) * size
+        self.count = 0
+        for position in xrange(len(oldLowKeys)):
+            stored = oldHighKeys[position] << 32 | oldLowKeys[position]
+            if stored != 0:
+                slot = self.add(stored - 1)
+                for field, oldField in zip(self.fields, oldFields):
+                    field[slot] = oldField[position]
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"